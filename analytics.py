@@ -0,0 +1,102 @@
+import json
+import pandas as pd
+
+# Long table written next to history: one row per (run_id, brand, vector)
+VECTOR_COLUMNS = [
+    "date", "run_id", "category", "use_case", "brand", "vector",
+    "score", "citation", "weight", "kpi", "vector_type", "source_logic",
+]
+
+def _as_dict(val):
+    """Parses a vector_* JSON blob; anything empty or malformed becomes {}."""
+    if isinstance(val, dict):
+        return val
+    if isinstance(val, str) and len(val) > 2:
+        try:
+            parsed = json.loads(val)
+        except ValueError:
+            return {}
+        return parsed if isinstance(parsed, dict) else {}
+    return {}
+
+def _text(val):
+    if val is None:
+        return None
+    return val if isinstance(val, str) else json.dumps(val)
+
+def normalize_vectors(df):
+    """Explodes the vector_* JSON columns of history rows into the long VECTOR_COLUMNS table.
+
+    Vector names are matched case-insensitively across the four blobs (the
+    spelling from vector_weights wins), so consumers never re-parse JSON.
+    """
+    out = []
+    for row in df.to_dict("records"):
+        blobs = {col: _as_dict(row.get(col)) for col in ("vector_weights", "vector_scores", "vector_citations", "vector_details")}
+        lowered = {col: {str(k).lower(): v for k, v in blob.items()} for col, blob in blobs.items()}
+        names = {}
+        for blob in blobs.values():
+            for k in blob:
+                names.setdefault(str(k).lower(), str(k))
+        for key, vec in names.items():
+            info = lowered["vector_details"].get(key)
+            info = info if isinstance(info, dict) else {}
+            out.append({
+                "date": row.get("date"),
+                "run_id": row.get("run_id"),
+                "category": row.get("category"),
+                "use_case": row.get("use_case"),
+                "brand": row.get("brand"),
+                "vector": vec,
+                "score": lowered["vector_scores"].get(key),
+                "citation": _text(lowered["vector_citations"].get(key)),
+                "weight": lowered["vector_weights"].get(key),
+                "kpi": _text(info.get("kpi")),
+                "vector_type": _text(info.get("type")),
+                "source_logic": _text(info.get("source_logic")),
+            })
+    vec_df = pd.DataFrame(out, columns=VECTOR_COLUMNS)
+    vec_df["score"] = pd.to_numeric(vec_df["score"], errors="coerce")
+    vec_df["weight"] = pd.to_numeric(vec_df["weight"], errors="coerce")
+    return vec_df
+
+# Rollup table: one row per (category, use_case, date, brand) per audit run.
+# Re-runs append more rows for the same key; readers just sum them.
+ROLLUP_KEYS = ["category", "use_case", "date", "brand"]
+ROLLUP_COLUMNS = ROLLUP_KEYS + ["type", "mentions", "rank_sum", "rank_count", "distance_sum", "distance_count"]
+
+def _numeric(df, col):
+    if col not in df.columns:
+        return pd.Series(float("nan"), index=df.index)
+    return pd.to_numeric(df[col], errors="coerce").astype("float64")  # Sums stay float64 even from float32 history
+
+def compute_rollups(df):
+    """Aggregates history rows into ROLLUP_COLUMNS (mention count, rank and distance sums/counts)."""
+    if df.empty or not set(ROLLUP_KEYS) <= set(df.columns):
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    rank = _numeric(df, "rank")
+    dist = _numeric(df, "total_distance")
+    work = pd.DataFrame({
+        "category": df["category"], "use_case": df["use_case"], "date": df["date"].astype(str), "brand": df["brand"],
+        "type": df["type"] if "type" in df.columns else None,
+        "rank_sum": rank, "rank_count": rank.notna().astype("int64"),
+        "distance_sum": dist, "distance_count": dist.notna().astype("int64"),
+    })
+    out = work.groupby(ROLLUP_KEYS, sort=False, observed=True).agg(
+        type=("type", "first"), mentions=("brand", "size"),
+        rank_sum=("rank_sum", "sum"), rank_count=("rank_count", "sum"),
+        distance_sum=("distance_sum", "sum"), distance_count=("distance_count", "sum"),
+    ).reset_index()
+    return out[ROLLUP_COLUMNS]
+
+def summarize_rollups(roll):
+    """Per-brand Mentions, Avg_Rank, Avg_Distance, type and Visibility_Score from rollup rows."""
+    g = roll.groupby("brand", sort=False, observed=True).agg(
+        type=("type", "first"), Mentions=("mentions", "sum"),
+        rank_sum=("rank_sum", "sum"), rank_count=("rank_count", "sum"),
+        distance_sum=("distance_sum", "sum"), distance_count=("distance_count", "sum"),
+    )
+    g["Avg_Rank"] = g["rank_sum"] / g["rank_count"].where(g["rank_count"] > 0)
+    g["Avg_Distance"] = g["distance_sum"] / g["distance_count"].where(g["distance_count"] > 0)
+    g["Visibility_Score"] = g["Mentions"] / g["Avg_Rank"]
+    return g.reset_index()[["brand", "type", "Mentions", "Avg_Rank", "Avg_Distance", "Visibility_Score"]]
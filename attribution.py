@@ -0,0 +1,77 @@
+"""Domain attribution: how much of each decision vector's weight each cited source carries.
+
+key_sources comes in two shapes inside vector_details:
+  - scored: [{"domain": "reddit.com", "score": 3}, ...]  -> share = score / sum(scores)
+  - ranked: ["reddit.com", "youtube.com", ...]           -> share = (1/(i+1)) / sum(1/(j+1))
+A source's power is its share times the vector's weight.
+"""
+import pandas as pd
+from analytics import _as_dict
+
+RUN_KEYS = ["date", "category", "use_case"]
+SHARE_GROUP = RUN_KEYS + ["run_id", "vector"]
+SOURCE_COLUMNS = SHARE_GROUP + ["weight", "position", "domain", "share", "power"]
+
+def _first_blob(df, col):
+    """First row per (date, category, use_case) with a non-empty blob in `col`."""
+    if col not in df.columns:
+        return pd.DataFrame(columns=RUN_KEYS + ["run_id", col])
+    has = df[col].map(lambda v: isinstance(v, str) and len(v) > 2)
+    cols = RUN_KEYS + (["run_id"] if col == "vector_weights" else []) + [col]
+    return df.loc[has, cols].drop_duplicates(subset=RUN_KEYS, keep="first")
+
+def explode_sources(df):
+    """One row per key_sources entry (raw score, before normalisation) for every date/slice in df."""
+    if df.empty or not set(RUN_KEYS) <= set(df.columns):
+        return pd.DataFrame(columns=SHARE_GROUP + ["weight", "position", "domain", "raw_score"])
+    runs = _first_blob(df, "vector_weights").merge(_first_blob(df, "vector_details"), on=RUN_KEYS)
+    out = []
+    for run in runs.to_dict("records"):
+        weights = _as_dict(run["vector_weights"])
+        details = _as_dict(run["vector_details"])
+        lowered = {str(k).lower(): v for k, v in details.items()}
+        for vec, weight in weights.items():
+            info = details.get(vec) or lowered.get(str(vec).lower())
+            sources = info.get("key_sources", []) if isinstance(info, dict) else []
+            if not isinstance(sources, list) or not sources:
+                continue
+            scored = isinstance(sources[0], dict)
+            for i, item in enumerate(sources):
+                if scored and isinstance(item, dict):
+                    domain, raw = item.get("domain", "Unknown"), item.get("score", 1)
+                elif not scored and isinstance(item, str):
+                    domain, raw = item, 1 / (i + 1)
+                else:
+                    continue
+                out.append({
+                    "date": pd.Timestamp(run["date"]).date().isoformat(), "category": run["category"], "use_case": run["use_case"],
+                    "run_id": run["run_id"], "vector": str(vec), "weight": weight, "position": i,
+                    "domain": str(domain).strip().lower(), "raw_score": raw,
+                })
+    return pd.DataFrame(out, columns=SHARE_GROUP + ["weight", "position", "domain", "raw_score"])
+
+def weighted_shares(sources):
+    """Adds each source's normalised share of its vector and its weighted power (vectorised)."""
+    sources = sources.copy()
+    sources["weight"] = pd.to_numeric(sources["weight"], errors="coerce")
+    sources = sources[sources["weight"].fillna(0) != 0]
+    raw = pd.to_numeric(sources["raw_score"], errors="coerce").fillna(1)
+    total = raw.groupby([sources[c] for c in SHARE_GROUP], sort=False, observed=True).transform("sum")
+    sources["share"] = raw / total.where(total != 0, 1)
+    sources["power"] = sources["share"] * sources["weight"]
+    return sources[SOURCE_COLUMNS].reset_index(drop=True)
+
+def source_shares(df):
+    """History rows -> SOURCE_COLUMNS table, for all dates and slices in one pass."""
+    return weighted_shares(explode_sources(df))
+
+def domain_power(shares, by=()):
+    """Power Score (summed weighted share) and Citations per domain, optionally per `by` columns (e.g. date)."""
+    keys = list(by) + ["domain"]
+    out = shares.groupby(keys, sort=False, observed=True).agg(**{"Power Score": ("power", "sum"), "Citations": ("power", "size")})
+    return out.reset_index().rename(columns={"domain": "Domain"})
+
+def attribution_map(shares):
+    """Vector -> Source sizes for the sunburst."""
+    out = shares.groupby(["vector", "domain"], sort=False, observed=True)["power"].sum().reset_index()
+    return out.rename(columns={"vector": "Vector", "domain": "Source", "power": "Size"})
@@ -0,0 +1,215 @@
+import asyncio
+import datetime
+import random
+import time
+import openai
+from openai import AsyncOpenAI
+from response_cache import target_key
+from providers import OpenAIProvider, LatencyTracker, call_provider
+from tracing import usage_fields
+
+MODEL = "gpt-4o"
+EXPECTED_COMPLETION_TOKENS = 256  # Reserved per call against the tokens/min budget
+
+# --- REQUEST / ROW BUILDERS (shared by the sync and async paths) ---
+def build_request(target):
+    """Returns the chat.completions.create kwargs for one target."""
+    my_brand = target.get('brand', 'Unknown')
+    return {
+        "model": MODEL,
+        "messages": [{"role": "user", "content": f"Return JSON with a fake score for {my_brand}"}],
+        "response_format": {"type": "json_object"},
+    }
+
+def build_row(target, content, engine="openai"):
+    """Builds the history row for one audited target from the model's reply."""
+    # (The reply is not parsed yet; we still write the placeholder row.)
+    return {
+        "date": datetime.date.today(),
+        "run_id": "TEST_RUN",
+        "brand": target.get('brand', 'Unknown'),
+        "category": target.get('category'),
+        "use_case": target.get('use_case'),
+        "type": "Target",
+        "rank": 1,
+        "vector_scores": "{}",
+        "vector_citations": "{}",
+        "engine": engine
+    }
+
+def estimate_tokens(request):
+    """Rough token estimate (~4 chars/token) used to reserve rate-limit budget."""
+    chars = sum(len(m.get("content", "")) for m in request.get("messages", []))
+    return chars // 4 + EXPECTED_COMPLETION_TOKENS
+
+# --- RATE LIMITING ---
+class TokenBucket:
+    """Async token bucket refilled continuously at `rate_per_min`."""
+
+    def __init__(self, rate_per_min, capacity=None):
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity or rate_per_min
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+class RateLimiter:
+    """Requests/min + tokens/min limits. A limit of None/0 means unlimited."""
+
+    def __init__(self, rpm=None, tpm=None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+
+    async def acquire(self, tokens):
+        if self.requests:
+            await self.requests.acquire(1)
+        if self.tokens:
+            await self.tokens.acquire(tokens)
+
+# --- RETRIES ---
+def is_retryable(exc):
+    """True for 429s, 5xx responses and connection/timeout errors (any provider)."""
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return isinstance(exc, (openai.APIConnectionError, asyncio.TimeoutError, TimeoutError, ConnectionError))
+
+def _retry_after(exc):
+    """Seconds from a Retry-After header, if the server sent one."""
+    response = getattr(exc, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except Exception:
+        return None
+
+def _retry_delay(exc, attempt, max_retries, base_delay, max_delay):
+    """Seconds to wait before retrying after `attempt` earlier retries, or None to give up."""
+    if attempt >= max_retries or not is_retryable(exc):
+        return None
+    delay = _retry_after(exc) or min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+    print(f"⏳ Retry {attempt + 1}/{max_retries} in {delay:.1f}s ({exc.__class__.__name__})")
+    return delay
+
+async def call_with_retries(fn, max_retries=5, base_delay=1.0, max_delay=30.0):
+    """Awaits fn(), retrying retryable errors with jittered exponential backoff."""
+    attempt = 0
+    while True:
+        try:
+            return await fn()
+        except Exception as e:
+            delay = _retry_delay(e, attempt, max_retries, base_delay, max_delay)
+            if delay is None:
+                raise
+            attempt += 1
+            await asyncio.sleep(delay)
+
+def call_with_retries_sync(fn, max_retries=5, base_delay=1.0, max_delay=30.0):
+    """call_with_retries for blocking clients (the sync audit loop)."""
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            delay = _retry_delay(e, attempt, max_retries, base_delay, max_delay)
+            if delay is None:
+                raise
+            attempt += 1
+            time.sleep(delay)
+
+# --- ENGINE ---
+async def audit_targets_async(targets, providers, concurrency=8, rpm=None, tpm=None, max_retries=5,
+                              cache=None, checkpoint=None, hedge=False, tracer=None):
+    """Audits every target on every provider concurrently.
+
+    Rows come back in (target, provider) order, tagged with the engine that
+    produced them; failed calls are skipped. With a checkpoint, rows finished by
+    an earlier attempt are reused and each new row is recorded as soon as it
+    exists; with a cache, replies are reused. rpm/tpm apply per provider. With a
+    tracer, every API call is recorded as an "llm.<provider>" span (latency
+    including retries, retry count, token usage).
+    """
+    limiters = {p.name: RateLimiter(rpm, tpm) for p in providers}
+    tracker = LatencyTracker()
+    sem = asyncio.Semaphore(max(1, concurrency))
+    done = checkpoint.load() if checkpoint else {}
+
+    async def audit_one(target, provider):
+        my_brand = target.get('brand', 'Unknown')
+        key = target_key(target, provider.name)
+        if key in done:
+            print(f"♻️ Resumed {my_brand} ({provider.name}) from checkpoint")
+            return done[key]
+        request = provider.prepare(build_request(target))
+        cached = cache.get(request) if cache else None
+
+        if cached is not None:
+            content = cached["content"]
+            print(f"💾 Cache hit for {my_brand} ({provider.name})")
+        else:
+            attempts = 0
+
+            def budget():
+                return limiters[provider.name].acquire(estimate_tokens(request))
+
+            async def attempt():
+                nonlocal attempts
+                attempts += 1
+                # Every request sent (retries and hedges included) pays into the rate limiter
+                await budget()
+                return await call_provider(provider, request, tracker, hedge, acquire=budget)
+
+            async with sem:
+                started = time.perf_counter()
+                try:
+                    content, usage, hedged = await call_with_retries(attempt, max_retries=max_retries)
+                except Exception as e:
+                    if tracer:
+                        tracer.record(f"llm.{provider.name}", time.perf_counter() - started, "error",
+                                      brand=my_brand, retries=attempts - 1, error=repr(e))
+                    print(f"❌ {provider.name} Error ({my_brand}): {e!r}")
+                    return None
+                if tracer:
+                    tracer.record(f"llm.{provider.name}", time.perf_counter() - started, brand=my_brand,
+                                  retries=attempts - 1, hedged=hedged, **usage_fields(usage))
+            print(f"✅ {provider.name} Responded for {my_brand}{' (hedged)' if hedged else ''}")
+            if cache:
+                cache.put(request, content, usage)
+
+        row = build_row(target, content, engine=provider.name)
+        if checkpoint:
+            checkpoint.record(key, row)
+        return row
+
+    rows = await asyncio.gather(*(audit_one(t, p) for t in targets for p in providers))
+    return [r for r in rows if r is not None]
+
+def run_targets_async(targets, api_key=None, base_url=None, client=None, providers=None, **kwargs):
+    """Sync entry point. Defaults to a single OpenAI provider (AsyncOpenAI with SDK retries off).
+
+    Providers are closed when the run ends, except around a caller-supplied `client`.
+    """
+    async def main():
+        active = providers or [OpenAIProvider(client or AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0))]
+        try:
+            return await audit_targets_async(targets, active, **kwargs)
+        finally:
+            if client is None:
+                for provider in active:
+                    await provider.aclose()
+    return asyncio.run(main())
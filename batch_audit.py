@@ -0,0 +1,167 @@
+"""OpenAI Batch API path for large nightly audits.
+
+Cycle: write <cache dir>/batch/requests.jsonl from the config targets -> upload +
+create the batch -> poll until it finishes -> stream the result file back into
+history rows. batch/state.json remembers a submitted batch, so re-running the same
+day resumes polling instead of paying for a second batch; it sits in the response
+cache directory so CI keeps it between runs. Polling gives up after BATCH_TIMEOUT
+(0 = submit or check once, then exit) and a later run collects the results.
+"""
+import datetime
+import hashlib
+import json
+import os
+import time
+from audit_engine import build_request, build_row
+from response_cache import target_key, CACHE_DIR
+from tracing import span
+
+BATCH_DIR = os.environ.get("AUDIT_BATCH_DIR")  # Default: batch/ under the cache dir, which CI persists
+BATCH_POLL_INTERVAL = float(os.environ.get("AUDIT_BATCH_POLL_INTERVAL", 30))
+BATCH_TIMEOUT = float(os.environ.get("AUDIT_BATCH_TIMEOUT", 5 * 3600))  # Stop polling inside the 6h Actions job limit
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+def custom_id(target):
+    return f"target-{target_key(target)}"
+
+def write_batch_file(targets, path):
+    """Writes one Batch API request line per unique target. Returns {custom_id: target}."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    by_id = {}
+    with open(path, "w") as f:
+        for target in targets:
+            cid = custom_id(target)
+            if cid in by_id:
+                continue  # custom_id must be unique within a batch
+            by_id[cid] = target
+            f.write(json.dumps({"custom_id": cid, "method": "POST", "url": BATCH_ENDPOINT, "body": build_request(target)}) + "\n")
+    return by_id
+
+def submit_batch(client, path):
+    """Uploads the request file and creates the batch."""
+    with open(path, "rb") as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    return client.batches.create(input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT, completion_window="24h")
+
+def wait_for_batch(client, batch_id, poll_interval=BATCH_POLL_INTERVAL, timeout=None):
+    """Polls until the batch reaches a terminal status (or `timeout` seconds pass)."""
+    started = time.monotonic()
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = getattr(batch, "request_counts", None)
+        progress = f" ({counts.completed}/{counts.total} done, {counts.failed} failed)" if counts else ""
+        print(f"⏳ Batch {batch_id}: {batch.status}{progress}")
+        if batch.status in TERMINAL_STATUSES:
+            return batch
+        if timeout is not None and time.monotonic() - started > timeout:
+            return batch
+        time.sleep(poll_interval)
+
+def iter_results(client, file_id):
+    """Streams a result file line by line (it is never held in memory whole)."""
+    with client.files.with_streaming_response.content(file_id) as resp:
+        for line in resp.iter_lines():
+            if line.strip():
+                yield json.loads(line)
+
+def parse_results(results, targets_by_id, cache=None, totals=None):
+    """Result lines -> {custom_id: row}; failed lines are reported and skipped.
+
+    Token usage is summed into `totals` when given.
+    """
+    rows = {}
+    for item in results:
+        cid = item.get("custom_id")
+        target = targets_by_id.get(cid)
+        response = item.get("response") or {}
+        if target is None:
+            continue
+        if item.get("error") or response.get("status_code") != 200:
+            print(f"❌ Batch Error ({target.get('brand', 'Unknown')}): {item.get('error') or response.get('status_code')}")
+            continue
+        body = response.get("body") or {}
+        content = body["choices"][0]["message"]["content"]
+        if totals is not None:
+            for k, v in (body.get("usage") or {}).items():
+                if k in ("prompt_tokens", "completion_tokens"):
+                    totals[k] = totals.get(k, 0) + v
+        if cache:
+            cache.put(build_request(target), content, body.get("usage"))
+        rows[cid] = build_row(target, content)
+    return rows
+
+def _fingerprint(targets_by_id):
+    return hashlib.sha1(json.dumps(sorted(targets_by_id)).encode("utf-8")).hexdigest()
+
+def _load_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def batch_dir_for(cache_dir=CACHE_DIR):
+    """Where requests.jsonl/state.json go: AUDIT_BATCH_DIR if set, else batch/ under the cache dir."""
+    return BATCH_DIR or os.path.join(cache_dir, "batch")
+
+def run_batch(targets, client, batch_dir=None, poll_interval=BATCH_POLL_INTERVAL, timeout=None, cache=None,
+              tracer=None):
+    """Audits targets through the Batch API. Rows come back in target order, same schema as the other modes.
+
+    Returns None if the batch is still running after `timeout` seconds; its state is kept,
+    so the next call resumes it. With a tracer, submit / wait / collect are recorded as
+    "batch.*" spans (collect carries token totals).
+    """
+    batch_dir = batch_dir or batch_dir_for()
+    rows = {}
+    pending = []
+    for target in targets:
+        cached = cache.get(build_request(target)) if cache else None
+        if cached is not None:
+            rows[custom_id(target)] = build_row(target, cached["content"])
+        else:
+            pending.append(target)
+    print(f"📦 {len(pending)} targets to batch ({len(rows)} served from cache)")
+
+    if pending:
+        input_path = os.path.join(batch_dir, "requests.jsonl")
+        state_path = os.path.join(batch_dir, "state.json")
+        targets_by_id = write_batch_file(pending, input_path)
+        fingerprint = _fingerprint(targets_by_id)
+        today = datetime.date.today().isoformat()
+
+        # 1. SUBMIT (or resume today's batch for the same targets)
+        state = _load_state(state_path)
+        if state.get("date") == today and state.get("targets") == fingerprint:
+            print(f"♻️ Resuming batch {state['batch_id']}")
+        else:
+            with span(tracer, "batch.submit", requests=len(targets_by_id)):
+                batch = submit_batch(client, input_path)
+            state = {"batch_id": batch.id, "date": today, "targets": fingerprint}
+            with open(state_path, "w") as f:
+                json.dump(state, f)
+            print(f"🚀 Submitted batch {batch.id}")
+
+        # 2. POLL
+        with span(tracer, "batch.wait", batch_id=state["batch_id"]) as attrs:
+            batch = wait_for_batch(client, state["batch_id"], poll_interval=poll_interval, timeout=timeout)
+            attrs["batch_status"] = batch.status
+        if batch.status not in TERMINAL_STATUSES:
+            print("⚠️ Batch still running; re-run later to collect results.")
+            return None
+        if batch.status != "completed":
+            os.remove(state_path)  # Let the next run submit a fresh batch
+            print(f"❌ Batch ended with status {batch.status}")
+        else:
+            # 3. COLLECT
+            with span(tracer, "batch.collect") as attrs:
+                if batch.output_file_id:
+                    rows.update(parse_results(iter_results(client, batch.output_file_id), targets_by_id, cache, totals=attrs))
+                if getattr(batch, "error_file_id", None):
+                    failed = sum(1 for _ in iter_results(client, batch.error_file_id))
+                    attrs["failed"] = failed
+                    print(f"⚠️ {failed} batch requests failed")
+            os.remove(state_path)
+
+    return [rows[custom_id(t)] for t in targets if custom_id(t) in rows]
@@ -0,0 +1,326 @@
+"""Synthetic-scale benchmarks for history loading, dashboard aggregation, the audit loop and cold start.
+
+    python bench.py --rows 100000 1000000 --targets 5000 --out bench_results.json
+    python bench.py --rows 100000 --compare bench_results.json   # flag regressions vs an earlier run
+
+Each size gets a fresh temporary store built from synthetic rows (realistic
+vector_* JSON blobs, many brands/categories/use cases). Results are written as
+JSON so runs can be diffed. The audit run is timed twice: the async calls
+alone, and with its rows saved into a store pre-seeded with --seed-rows of
+history, which is what a nightly job pays. The startup suite times each entry point in a
+fresh interpreter and lists which heavy libraries (Streamlit, PyGithub,
+plotly) it loaded.
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+# --- SYNTHETIC DATA ---
+VECTORS = ["Grip", "Comfort", "Durability", "Weight", "Price", "Style", "Support", "Breathability"]
+DOMAINS = ["reddit.com", "runnersworld.com", "youtube.com", "amazon.com", "outsideonline.com",
+           "irunfar.com", "believeintherun.com", "wikipedia.org", "nytimes.com", "rei.com"]
+
+def _blob_pool(rng, size=256, n_vectors=6):
+    """Pre-built vector_* JSON strings; rows sample from the pool so generation stays fast at 10M rows."""
+    pool = []
+    for _ in range(size):
+        vecs = list(rng.choice(VECTORS, size=n_vectors, replace=False))
+        weights = rng.dirichlet(np.ones(n_vectors)) * 100
+        details = {}
+        for v in vecs:
+            doms = list(rng.choice(DOMAINS, size=int(rng.integers(2, 6)), replace=False))
+            if rng.random() < 0.5:
+                sources = [{"domain": d, "score": int(rng.integers(1, 10))} for d in doms]
+            else:
+                sources = doms
+            details[v] = {"kpi": f"{v} KPI", "type": "Hard" if rng.random() < 0.5 else "Soft",
+                          "source_logic": "Expert reviews", "key_sources": sources}
+        pool.append({
+            "vector_scores": json.dumps({v: int(rng.integers(1, 11)) for v in vecs}),
+            "vector_citations": json.dumps({v: f"https://{rng.choice(DOMAINS)}/{int(rng.integers(1e6))}" for v in vecs}),
+            "vector_weights": json.dumps({v: round(float(w)) for v, w in zip(vecs, weights)}),
+            "vector_details": json.dumps(details),
+        })
+    return pool
+
+def synth_history(n_rows, n_brands=500, n_categories=20, n_use_cases=5, n_days=90, seed=0, start=None):
+    """A history DataFrame shaped like real audit output, over n_days from `start` (default 2026-01-01)."""
+    rng = np.random.default_rng(seed)
+    start = start or datetime.date(2026, 1, 1)
+    dates = np.array([(start + datetime.timedelta(days=i)).isoformat() for i in range(n_days)], dtype=object)
+    categories = np.array([f"Category {i:02d}" for i in range(n_categories)], dtype=object)
+    use_cases = np.array([f"Use Case {i}" for i in range(n_use_cases)], dtype=object)
+    brands = np.array([f"Brand {i:04d}" for i in range(n_brands)], dtype=object)
+    pool = _blob_pool(rng)
+
+    d_idx = np.sort(rng.integers(0, n_days, n_rows))  # Roughly chronological, like appended history
+    b_idx = rng.integers(0, n_brands, n_rows)
+    p_idx = rng.integers(0, len(pool), n_rows)
+    df = pd.DataFrame({
+        "date": dates[d_idx],
+        "run_id": np.char.add("run-", dates[d_idx].astype(str)).astype(object),
+        "brand": brands[b_idx],
+        "category": categories[rng.integers(0, n_categories, n_rows)],
+        "use_case": use_cases[rng.integers(0, n_use_cases, n_rows)],
+        "type": np.where(b_idx % 10 == 0, "Target", "Competitor").astype(object),
+        "rank": rng.integers(1, 11, n_rows),
+        "total_distance": rng.uniform(0, 10, n_rows).round(3),
+    })
+    for col in ("vector_scores", "vector_citations", "vector_weights", "vector_details"):
+        values = np.array([p[col] for p in pool], dtype=object)
+        df[col] = values[p_idx]
+    df["engine"] = "openai"
+    return df
+
+def synth_targets(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{"brand": f"Brand {i:04d}", "category": f"Category {int(rng.integers(20)):02d}",
+             "use_case": f"Use Case {int(rng.integers(5))}"} for i in range(n)]
+
+# --- HARNESS ---
+def timed(fn, repeat=3):
+    """Runs fn `repeat` times; returns (median seconds, last result)."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), result
+
+def _legacy_scorecard(latest_df):
+    """The pre-normalisation render path (iterrows + json.loads), kept as a reference point."""
+    score_data = []
+    for _, row in latest_df.iterrows():
+        scores = json.loads(row["vector_scores"])
+        scores["Brand"] = row["brand"]
+        score_data.append(scores)
+    return pd.DataFrame(score_data).set_index("Brand")
+
+def bench_size(n_rows, repeat, seed):
+    """Builds a store of n_rows synthetic rows in a temp dir and times the dashboard hot paths."""
+    import storage
+    from analytics import normalize_vectors, compute_rollups, summarize_rollups
+    from attribution import source_shares, domain_power
+
+    results = []
+
+    def record(name, seconds, **extra):
+        results.append({"name": name, "rows": n_rows, "seconds": round(seconds, 6), **extra})
+        print(f"  {name:<28} {seconds * 1000:>10.1f} ms")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            print(f"📐 {n_rows:,} rows")
+            t0 = time.perf_counter()
+            history = synth_history(n_rows, seed=seed)
+            record("generate", time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            storage.append_partitioned("history", history)
+            storage.append_partitioned("rollups", compute_rollups(history))
+            storage.append_partitioned("sources", source_shares(history))
+            # Scorecard only reads the latest date, so only that slice of vectors is materialised here
+            latest = history[history["date"] == history["date"].max()]
+            storage.append_partitioned("vectors", normalize_vectors(latest))
+            record("ingest", time.perf_counter() - t0)
+
+            seconds, df = timed(storage._load_history, repeat)
+            record("load_history", seconds, memory_mb=round(df.memory_usage(deep=True).sum() / 2 ** 20, 1))
+
+            cat, case = df["category"].iloc[0], df["use_case"].iloc[0]
+            seconds, dff = timed(lambda: df[(df["category"] == cat) & (df["use_case"] == case)], repeat)
+            record("filter_slice", seconds)
+            record("list_slices", timed(lambda: storage._build_index("history"), repeat)[0])
+            record("load_slice", timed(lambda: storage._load_slice("history", cat, case, None), repeat)[0])
+
+            def leaderboard_raw():
+                rank = pd.to_numeric(dff["rank"], errors="coerce")
+                counts = dff["brand"].value_counts()
+                return (counts / rank.groupby(dff["brand"]).mean()).sort_values(ascending=False).head(10)
+            record("leaderboard_raw", timed(leaderboard_raw, repeat)[0])
+
+            rollups = storage._load_partitioned("rollups")
+            def leaderboard_rollup():
+                r = rollups[(rollups["category"] == cat) & (rollups["use_case"] == case)]
+                return summarize_rollups(r).sort_values("Visibility_Score", ascending=False).head(10)
+            record("leaderboard_rollup", timed(leaderboard_rollup, repeat)[0])
+
+            latest_date = dff["date"].max()
+            latest_df = dff[dff["date"] == latest_date]
+            record("scorecard_json", timed(lambda: _legacy_scorecard(latest_df), repeat)[0])
+
+            vectors = storage._load_partitioned("vectors")
+            def scorecard_pivot():
+                v = vectors[(vectors["category"] == cat) & (vectors["use_case"] == case) & (vectors["date"] == latest_date)]
+                return v.pivot_table(index="brand", columns="vector", values="score", aggfunc="first")
+            record("scorecard_pivot", timed(scorecard_pivot, repeat)[0])
+
+            record("attribution_batch", timed(lambda: domain_power(source_shares(history), by=["date"]), repeat)[0])
+            sources = storage._load_partitioned("sources")
+            def attribution_slice():
+                s = sources[(sources["category"] == cat) & (sources["use_case"] == case) & (sources["date"] == latest_date)]
+                return domain_power(s)
+            record("attribution_slice", timed(attribution_slice, repeat)[0])
+        finally:
+            os.chdir(cwd)
+    return results
+
+def bench_audit(n_targets, concurrency, latency, seed_rows=0, seed=0):
+    """End-to-end async audit throughput against the in-process fake client.
+
+    With seed_rows, the run's rows are then saved (history, derived tables,
+    trends) into a store pre-seeded with that much history up to yesterday.
+    """
+    from audit_engine import run_targets_async
+    from daily_audit import save_run
+    from fakes import FakeAsyncOpenAI
+    import storage
+
+    client = FakeAsyncOpenAI(latency=latency)
+    targets = synth_targets(n_targets)
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # Per-target status lines would dominate the timing
+        rows = run_targets_async(targets, client=client, concurrency=concurrency)
+    seconds = time.perf_counter() - t0
+    print(f"🚀 audit: {n_targets:,} targets in {seconds:.2f}s ({n_targets / seconds:,.0f}/s)")
+    results = [{"name": "audit_async", "rows": n_targets, "seconds": round(seconds, 6),
+                "targets_per_sec": round(n_targets / seconds, 1), "rows_out": len(rows),
+                "concurrency": concurrency, "latency": latency}]
+    if not seed_rows:
+        return results
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        storage.invalidate_cache()
+        try:
+            start = datetime.date.today() - datetime.timedelta(days=90)
+            with contextlib.redirect_stdout(io.StringIO()):
+                save_run(synth_history(seed_rows, n_days=90, seed=seed, start=start))
+            storage.invalidate_cache()  # Time the save as a fresh job process would run it
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                save_run(pd.DataFrame(rows))
+            save_seconds = time.perf_counter() - t0
+        finally:
+            storage.invalidate_cache()
+            os.chdir(cwd)
+    print(f"💾 save: {len(rows):,} rows into a {seed_rows:,}-row store in {save_seconds:.2f}s "
+          f"(audit + save {seconds + save_seconds:.2f}s)")
+    results.append({"name": "audit_save", "rows": seed_rows, "seconds": round(save_seconds, 6), "rows_in": len(rows)})
+    results.append({"name": "audit_run", "rows": n_targets, "seconds": round(seconds + save_seconds, 6),
+                    "seed_rows": seed_rows})
+    return results
+
+# --- STARTUP ---
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ("streamlit", "github", "plotly.express", "plotly.graph_objects")  # Reported when an entry point pulls them in
+STARTUP_IMPORTS = ["storage", "daily_audit", "github_utils"]
+
+_COLD_IMPORT = """
+import sys, time
+t0 = time.perf_counter()
+import {module}
+print(time.perf_counter() - t0)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+_COLD_APP = """
+import sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=120).run()
+print(time.perf_counter() - t0)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+def _fresh_python(code, cwd):
+    """Runs code in a new interpreter (nothing imported yet); returns its (seconds, heavy modules) lines."""
+    env = {**os.environ, "PYTHONPATH": HERE, "AUDIT_TRACE_DIR": ""}
+    out = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+    seconds, loaded = out.stdout.splitlines()[-2:]
+    return float(seconds), loaded
+
+def bench_startup(repeat):
+    """Cold-start times: importing each entry point, and a first dashboard run on an empty store."""
+    results = []
+
+    def record(name, runs):
+        seconds = min(r[0] for r in runs)
+        results.append({"name": name, "rows": 0, "seconds": round(seconds, 6), "loaded": runs[0][1]})
+        print(f"  {name:<28} {seconds * 1000:>10.1f} ms   {runs[0][1] or '-'}")
+
+    print("🧊 cold start (best of fresh interpreters; heavy modules loaded)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for module in STARTUP_IMPORTS:
+            code = _COLD_IMPORT.format(module=module, heavy=HEAVY_MODULES)
+            record(f"import_{module}", [_fresh_python(code, tmp) for _ in range(repeat)])
+        code = _COLD_APP.format(app=os.path.join(HERE, "app.py"), heavy=HEAVY_MODULES)
+        record("app_first_run", [_fresh_python(code, tmp) for _ in range(repeat)])
+    return results
+
+def compare(results, baseline_path, threshold):
+    """Prints ratios vs a previous results file; returns the regressions beyond `threshold`."""
+    with open(baseline_path) as f:
+        baseline = {(r["name"], r["rows"]): r["seconds"] for r in json.load(f)["results"]}
+    regressions = []
+    print(f"\n{'benchmark':<28} {'rows':>10} {'base ms':>10} {'now ms':>10} {'ratio':>7}")
+    for r in results:
+        base = baseline.get((r["name"], r["rows"]))
+        if not base:
+            continue
+        ratio = r["seconds"] / base
+        flag = " ⚠️" if ratio > 1 + threshold else ""
+        print(f"{r['name']:<28} {r['rows']:>10,} {base * 1000:>10.1f} {r['seconds'] * 1000:>10.1f} {ratio:>7.2f}{flag}")
+        if flag:
+            regressions.append(r)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark history loading, dashboard aggregation and the audit loop.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000], help="History sizes to test")
+    parser.add_argument("--targets", type=int, default=5000, help="Targets for the audit throughput run (0 to skip)")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per fake API call")
+    parser.add_argument("--seed-rows", type=int, default=100_000,
+                        help="History rows in the store the audit run is saved into (0 to time the audit only)")
+    parser.add_argument("--startup", action=argparse.BooleanOptionalAction, default=True,
+                        help="Time cold imports and the first dashboard run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown before flagging (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = bench_startup(args.repeat) if args.startup else []
+    for n in args.rows:
+        results += bench_size(n, args.repeat, args.seed)
+    if args.targets:
+        results += bench_audit(args.targets, args.concurrency, args.latency, args.seed_rows, args.seed)
+
+    report = {
+        "meta": {"timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                 "python": platform.python_version(), "pandas": pd.__version__, "platform": platform.platform()},
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Wrote {len(results)} results to {args.out}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
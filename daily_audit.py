@@ -3,13 +3,155 @@ import json
 import os
 import datetime
 import math
-from openai import OpenAI
-from github_utils import load_config, load_history, save_history_csv
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from openai import OpenAI, AsyncOpenAI
+from storage import (
+    load_config, load_history, append_history, export_history_csv,
+    append_partitioned, table_exists, partition_index, load_partitioned, load_slice
+)
+from audit_engine import build_request, build_row, run_targets_async, call_with_retries_sync
+from providers import usage_dict, build_providers
+from batch_audit import run_batch, batch_dir_for, BATCH_POLL_INTERVAL, BATCH_TIMEOUT
+from response_cache import ResponseCache, Checkpoint, target_key, CACHE_DIR, CACHE_RETENTION_DAYS
+from analytics import normalize_vectors, compute_rollups
+from attribution import source_shares
+from trends import build_trends, lookback_start
+from sharding import SHARD_DIR, parse_shard, plan_shards, write_shard, shard_files, merge_shards
+from tracing import span, run_tracer, usage_fields, format_summary, TRACE_DIR
 
 OPENAI_KEY = os.environ.get("OPENAI_API_KEY")
 
-def run_audit():
+# Execution settings (overridable on the command line)
+AUDIT_MODE = os.environ.get("AUDIT_MODE", "sync")  # "sync", "async" or "batch"
+AUDIT_CONCURRENCY = int(os.environ.get("AUDIT_CONCURRENCY", 8))
+AUDIT_RPM = int(os.environ.get("AUDIT_RPM", 0)) or None  # Requests per minute (0 = unlimited)
+AUDIT_TPM = int(os.environ.get("AUDIT_TPM", 0)) or None  # Tokens per minute (0 = unlimited)
+AUDIT_MAX_RETRIES = int(os.environ.get("AUDIT_MAX_RETRIES", 5))
+AUDIT_PROVIDERS = os.environ.get("AUDIT_PROVIDERS", "openai")  # e.g. "openai,gemini" (async mode)
+AUDIT_HEDGE = os.environ.get("AUDIT_HEDGE", "0") == "1"  # Fire a backup request after a provider's p95 latency
+
+def audit_targets_sync(client, targets, cache=None, checkpoint=None, tracer=None, max_retries=AUDIT_MAX_RETRIES):
+    """Audits targets one at a time (the original loop). 429/5xx replies are retried up to `max_retries`
+    times; pass a client with SDK retries off so each "llm.openai" span counts them all."""
+    new_rows = []
+    done = checkpoint.load() if checkpoint else {}
+    
+    for target in targets:
+        my_brand = target.get('brand', 'Unknown')
+        key = target_key(target, "openai")
+        if key in done:
+            print(f"♻️ Resumed {my_brand} from checkpoint")
+            new_rows.append(done[key])
+            continue
+        print(f"🔎 Auditing: {my_brand}")
+        
+        try:
+            request = build_request(target)
+            cached = cache.get(request) if cache else None
+            if cached is not None:
+                content = cached["content"]
+                print("💾 Cache hit!")
+            else:
+                # Simple test query to verify connection + tools
+                attempts = 0
+
+                def attempt():
+                    nonlocal attempts
+                    attempts += 1
+                    return client.chat.completions.create(**request)
+
+                with span(tracer, "llm.openai", brand=my_brand) as call:
+                    try:
+                        response = call_with_retries_sync(attempt, max_retries=max_retries)
+                    finally:
+                        call["retries"] = attempts - 1
+                    call.update(usage_fields(usage_dict(response)))
+                print("✅ OpenAI Responded!")
+                content = response.choices[0].message.content
+                if cache:
+                    cache.put(request, content, usage_dict(response))
+            
+            # (If we get here, the connection works. We proceed with the real logic in the next update.)
+            # For now, let's just create a dummy row to prove we can save the CSV.
+            row = build_row(target, content)
+            new_rows.append(row)
+            if checkpoint:
+                checkpoint.record(key, row)
+            
+        except Exception as e:
+            print(f"❌ OpenAI Error: {e}")
+    return new_rows
+
+# Tables derived from history rows at ingest: store table -> builder
+DERIVED_TABLES = {
+    "vectors": normalize_vectors,
+    "rollups": compute_rollups,
+    "sources": source_shares,
+}
+
+def backfill_tables():
+    """Builds derived store tables from existing history the first time they are needed."""
+    missing = [t for t in DERIVED_TABLES if not table_exists(t)]
+    if missing:
+        history = load_history()
+        for table in missing:
+            if not history.empty:
+                print(f"🧮 Backfilling {table} table from {len(history)} history rows...")
+            append_partitioned(table, DERIVED_TABLES[table](history))
+    if not table_exists("trends"):
+        rollups = load_partitioned("rollups")
+        if not rollups.empty:
+            print(f"🧮 Backfilling trends table from {len(rollups)} rollup rows...")
+        append_partitioned("trends", build_trends(rollups))
+
+def update_trends(rollups):
+    """Trend rows for a run's rollups, continuing each slice from the trend rows already stored."""
+    index = partition_index("trends")
+    out, parts, dates = [], [], set()
+    for (cat, case), part in rollups.groupby(["category", "use_case"], sort=False, observed=True):
+        first = part["date"].astype(str).min()
+        stored = index.loc[(index["category"] == str(cat)) & (index["use_case"] == str(case)), "date"]
+        if (stored > first).any():
+            # Rows for a date before stored trends: later windows changed, so rebuild the slice
+            print(f"🧮 Rebuilding trends for {cat} / {case}")
+            out.append(build_trends(load_slice("rollups", cat, case)))
+            continue
+        parts.append(part)
+        dates.update(d for d in stored.unique() if d >= lookback_start(first))
+    if parts:
+        # One read and one pass for every slice that continues its series (build_trends ignores
+        # prior rows of slices without new ones)
+        prior = load_slice("trends", dates=sorted(dates)) if dates else None
+        out.append(build_trends(pd.concat(parts, ignore_index=True), prior))
+    return pd.concat(out, ignore_index=True) if out else None
+
+def save_run(new_df, tracer=None):
+    """Appends a run's rows to history plus the derived tables the dashboard reads."""
+    with span(tracer, "save.backfill"):
+        backfill_tables()  # Before appending, so the new rows are not counted twice
+    with span(tracer, "save.history", rows=len(new_df)):
+        append_history(new_df)
+    derived = {}
+    for table, build in DERIVED_TABLES.items():
+        with span(tracer, f"save.{table}"):
+            derived[table] = build(new_df)
+            append_partitioned(table, derived[table])
+    with span(tracer, "save.trends"):
+        append_partitioned("trends", update_trends(derived["rollups"]))
+
+def run_audit(mode=AUDIT_MODE, concurrency=AUDIT_CONCURRENCY, rpm=AUDIT_RPM, tpm=AUDIT_TPM,
+              max_retries=AUDIT_MAX_RETRIES, use_cache=True, refresh=False, cache_dir=CACHE_DIR,
+              retention_days=CACHE_RETENTION_DAYS, batch_dir=None, poll_interval=BATCH_POLL_INTERVAL,
+              batch_timeout=BATCH_TIMEOUT, providers=AUDIT_PROVIDERS, hedge=AUDIT_HEDGE, trace_dir=TRACE_DIR,
+              shard=None, shard_dir=SHARD_DIR):
+    """Audits the configured targets and saves the rows. With shard=(index, count) only that shard's
+    targets are audited and the rows go to its shard file instead (see sharding.py).
+
+    Returns False if a batch is still running after `batch_timeout` (nothing is saved; re-run to collect)."""
     print("----- 🔍 DIAGNOSTIC MODE STARTED -----")
+    tag = f"shard-{shard[0]:02d}-of-{shard[1]:02d}" if shard else None
+    tracer = run_tracer(trace_dir, prefix=f"audit-{tag}" if tag else "audit")
     
     # 1. CHECK FILES
     print(f"📂 Current Directory Files: {os.listdir('.')}")
@@ -22,65 +164,170 @@ def run_audit():
         print("❌ config.json NOT found locally.")
 
     # 2. CHECK CONFIG LOAD
-    targets = load_config()
+    with span(tracer, "config.load") as attrs:
+        targets = load_config()
+        attrs["targets"] = len(targets or [])
     print(f"📊 Targets Loaded: {targets}")
     
     if not targets:
         print("⚠️ STOPPING: No targets found. Check your config.json syntax!")
         return
 
-    # 3. CHECK API KEY
-    if not OPENAI_KEY:
+    if shard:
+        index, count = shard
+        planned = plan_shards(targets, count)[index]
+        print(f"🧩 Shard {index}/{count}: {len(planned)} of {len(targets)} targets")
+        targets = [t for _, t in planned]
+        # Rate limits are account-wide: each shard takes its share
+        rpm = rpm and max(1, rpm // count)
+        tpm = tpm and max(1, tpm // count)
+        batch_dir = os.path.join(batch_dir or batch_dir_for(cache_dir), tag)
+
+    # 3. CHECK API KEY (only needed when OpenAI is one of the providers)
+    provider_names = [n.strip().lower() for n in providers.split(",") if n.strip()]
+    uses_openai = "openai" in provider_names
+    if uses_openai and not OPENAI_KEY:
         print("❌ STOPPING: OPENAI_API_KEY is missing from Secrets!")
         return
-    else:
-        print(f"🔑 API Key Found: {OPENAI_API_KEY[:5]}...")
+    elif uses_openai:
+        print(f"🔑 API Key Found: {OPENAI_KEY[:5]}...")
 
-    # 4. RUN TEST QUERY
-    print("🚀 Attempting OpenAI Connection...")
-    client = OpenAI(api_key=OPENAI_KEY)
-    
-    new_rows = []
-    
-    for target in targets:
-        my_brand = target.get('brand', 'Unknown')
-        print(f"🔎 Auditing: {my_brand}")
-        
-        try:
-            # Simple test query to verify connection + tools
-            response = client.chat.completions.create(
-                model="gpt-4o", 
-                messages=[{"role": "user", "content": f"Return JSON with a fake score for {my_brand}"}],
-                response_format={"type": "json_object"}
+    # 4. PREPARE CACHE + CHECKPOINT (lets a failed run resume without repeating calls)
+    cache = checkpoint = None
+    if use_cache:
+        cache = ResponseCache(cache_dir, retention_days=retention_days, refresh=refresh)
+        checkpoint = Checkpoint(cache_dir, run_key=f"{datetime.date.today().isoformat()}-{tag}" if tag else None)
+        if refresh:
+            checkpoint.clear()
+        with span(tracer, "cache.evict") as attrs:
+            attrs["removed"] = cache.evict()
+        print(f"🧹 Evicted {attrs['removed']} expired cache entries.")
+
+    # 5. RUN QUERIES
+    if provider_names != ["openai"] and mode != "async":
+        print(f"ℹ️ Providers '{providers}' need the async engine; switching from {mode} mode.")
+        mode = "async"
+    print(f"🚀 Attempting {', '.join(provider_names)} Connection ({mode} mode)...")
+    with span(tracer, "audit", mode=mode, targets=len(targets)) as attrs:
+        if mode == "async":
+            new_rows = run_targets_async(
+                targets, providers=build_providers(providers, AsyncOpenAI(api_key=OPENAI_KEY, max_retries=0) if uses_openai else None),
+                concurrency=concurrency, rpm=rpm, tpm=tpm, max_retries=max_retries,
+                cache=cache, checkpoint=checkpoint, hedge=hedge, tracer=tracer
             )
-            print("✅ OpenAI Responded!")
-            
-            # (If we get here, the connection works. We proceed with the real logic in the next update.)
-            # For now, let's just create a dummy row to prove we can save the CSV.
-            new_rows.append({
-                "date": datetime.date.today(),
-                "run_id": "TEST_RUN",
-                "brand": my_brand,
-                "category": target.get('category'),
-                "use_case": target.get('use_case'),
-                "type": "Target",
-                "rank": 1,
-                "vector_scores": "{}",
-                "vector_citations": "{}"
-            })
-            
-        except Exception as e:
-            print(f"❌ OpenAI Error: {e}")
+        elif mode == "batch":
+            # The few upload/create/poll calls of batch mode keep the SDK retries, with the same limit
+            client = OpenAI(api_key=OPENAI_KEY, max_retries=max_retries)
+            new_rows = run_batch(targets, client, batch_dir=batch_dir or batch_dir_for(cache_dir),
+                                 poll_interval=poll_interval, timeout=batch_timeout, cache=cache, tracer=tracer)
+        else:
+            client = OpenAI(api_key=OPENAI_KEY, max_retries=0)  # Retried in audit_targets_sync, so spans count them
+            new_rows = audit_targets_sync(client, targets, cache=cache, checkpoint=checkpoint, tracer=tracer,
+                                          max_retries=max_retries)
+        attrs["rows"] = len(new_rows or [])
+        if cache:
+            attrs.update(cache_hits=cache.hits, cache_misses=cache.misses)
+    if cache:
+        print(f"💾 Response cache: {cache.hits} hits, {cache.misses} misses.")
+    if new_rows is None:
+        # Batch still running: saving nothing keeps a shard's file missing, so the merge waits for it
+        print(f"⏱️ Timing summary{f' (trace: {tracer.path})' if tracer.path else ''}:")
+        print(format_summary(tracer.summary()))
+        return False
 
-    # 5. SAVE DATA
-    if new_rows:
-        print(f"💾 Saving {len(new_rows)} rows to history.csv...")
-        current_df = load_history()
-        new_df = pd.DataFrame(new_rows)
-        save_history_csv(pd.concat([current_df, new_df], ignore_index=True))
+    # 6. SAVE DATA
+    if shard:
+        # Written even when empty, so the merge can tell this shard finished
+        with span(tracer, "save.shard", rows=len(new_rows)):
+            path = write_shard(new_rows, planned, index, count, shard_dir)
+        if checkpoint:
+            checkpoint.clear()
+        print(f"🧩 Wrote {len(new_rows)} rows to {path} (run --merge-shards once every shard is done).")
+    elif new_rows:
+        print(f"💾 Saving {len(new_rows)} rows to history...")
+        with span(tracer, "save", rows=len(new_rows)):
+            save_run(pd.DataFrame(new_rows), tracer=tracer)
+        if checkpoint:
+            checkpoint.clear()  # The rows are in the store now; cached replies still cover a re-run
         print("✅ Data Saved Successfully.")
     else:
         print("⚠️ No new rows generated.")
 
+    # 7. TIMING SUMMARY
+    print(f"⏱️ Timing summary{f' (trace: {tracer.path})' if tracer.path else ''}:")
+    print(format_summary(tracer.summary()))
+
+def merge_and_save(shard_dir=SHARD_DIR, count=None, trace_dir=TRACE_DIR):
+    """Merges every shard file into one run, saves it and removes the files. False if shards are missing."""
+    tracer = run_tracer(trace_dir, prefix="merge")
+    try:
+        with span(tracer, "merge") as attrs:
+            new_df, paths = merge_shards(shard_dir, count)
+            attrs.update(shards=len(paths), rows=len(new_df))
+    except ValueError as e:
+        print(f"❌ Cannot merge shards: {e}")
+        return False
+    print(f"🧩 Merged {len(new_df)} rows from {len(paths)} shard files.")
+    if not new_df.empty:
+        print(f"💾 Saving {len(new_df)} rows to history...")
+        with span(tracer, "save", rows=len(new_df)):
+            save_run(new_df, tracer=tracer)
+        print("✅ Data Saved Successfully.")
+    else:
+        print("⚠️ No new rows generated.")
+    for path in paths:
+        os.remove(path)  # Saved; a second merge must not append them again
+    print(format_summary(tracer.summary()))
+    return True
+
+def run_sharded(workers, shard_dir=SHARD_DIR, trace_dir=TRACE_DIR, **kwargs):
+    """Runs shards 1..workers in a local process pool, then merges and saves them as one run."""
+    stale = [p for files in shard_files(shard_dir).values() for p in files.values()]
+    if stale:
+        print(f"🧹 Removing {len(stale)} unmerged shard files from an earlier run.")
+        for path in stale:
+            os.remove(path)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = [pool.submit(run_audit, shard=(i, workers), shard_dir=shard_dir, trace_dir=trace_dir, **kwargs)
+                for i in range(1, workers + 1)]
+        for job in jobs:
+            job.result()
+    return merge_and_save(shard_dir, workers, trace_dir)
+
 if __name__ == "__main__":
-    run_audit()
+    parser = argparse.ArgumentParser(description="Run the daily GEO audit.")
+    parser.add_argument("--mode", choices=["sync", "async", "batch"], default=AUDIT_MODE)
+    parser.add_argument("--concurrency", type=int, default=AUDIT_CONCURRENCY, help="Max in-flight requests (async mode)")
+    parser.add_argument("--rpm", type=int, default=AUDIT_RPM, help="Requests/min limit (async mode)")
+    parser.add_argument("--tpm", type=int, default=AUDIT_TPM, help="Tokens/min limit (async mode)")
+    parser.add_argument("--max-retries", type=int, default=AUDIT_MAX_RETRIES, help="Retries on 429/5xx")
+    parser.add_argument("--providers", default=AUDIT_PROVIDERS, help="Comma-separated engines to query, e.g. openai,gemini")
+    parser.add_argument("--hedge", action="store_true", default=AUDIT_HEDGE, help="Hedge slow calls after the provider's p95 latency")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached replies and checkpoints (replies are re-cached)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the response cache and checkpoints")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--retention-days", type=float, default=CACHE_RETENTION_DAYS, help="Evict cache entries older than this")
+    parser.add_argument("--batch-dir", help="Where batch mode writes requests.jsonl/state.json (default: <cache-dir>/batch)")
+    parser.add_argument("--poll-interval", type=float, default=BATCH_POLL_INTERVAL, help="Seconds between batch status checks")
+    parser.add_argument("--batch-timeout", type=float, default=BATCH_TIMEOUT,
+                        help="Stop polling after this many seconds and exit 1; a re-run collects the batch (0 = submit and exit)")
+    parser.add_argument("--trace-dir", default=TRACE_DIR, help="Where the per-run JSONL trace is written ('' to disable)")
+    parser.add_argument("--shard", type=parse_shard, metavar="INDEX/COUNT", help="Audit only this shard, e.g. 3/8 (1-based)")
+    parser.add_argument("--workers", type=int, default=1, help="Run this many shards in local processes, then merge")
+    parser.add_argument("--merge-shards", action="store_true", help="Merge the shard files into one run, save it and exit")
+    parser.add_argument("--shard-dir", default=SHARD_DIR, help="Where shard files are written and merged from")
+    parser.add_argument("--export-csv", metavar="PATH", help="Write the full history to a CSV file and exit")
+    args = parser.parse_args()
+    if args.export_csv:
+        print(f"📤 Exported {export_history_csv(args.export_csv)} rows to {args.export_csv}")
+        raise SystemExit(0)
+    if args.merge_shards:
+        raise SystemExit(0 if merge_and_save(args.shard_dir, trace_dir=args.trace_dir) else 1)
+    options = dict(mode=args.mode, concurrency=args.concurrency, rpm=args.rpm, tpm=args.tpm,
+                   max_retries=args.max_retries, use_cache=not args.no_cache, refresh=args.refresh,
+                   cache_dir=args.cache_dir, retention_days=args.retention_days,
+                   batch_dir=args.batch_dir, poll_interval=args.poll_interval, batch_timeout=args.batch_timeout,
+                   providers=args.providers, hedge=args.hedge, trace_dir=args.trace_dir, shard_dir=args.shard_dir)
+    if args.workers > 1 and not args.shard:
+        raise SystemExit(0 if run_sharded(args.workers, **options) else 1)
+    raise SystemExit(1 if run_audit(shard=args.shard, **options) is False else 0)
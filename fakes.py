@@ -0,0 +1,351 @@
+"""Local stand-ins for external services, for offline runs and tests.
+
+Usage:
+    with FakeOpenAIServer(fail_rate=0.2) as server:
+        client = AsyncOpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+
+    with FakeGitHubServer({"history.csv": csv_bytes}) as gh:
+        reader = GitHubReader("token", gh.repo_name, api_url=gh.url)
+"""
+import asyncio
+import json
+import base64
+import hashlib
+from email.parser import BytesParser
+from urllib.parse import urlsplit, parse_qs, unquote
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class _Handler(BaseHTTPRequestHandler):
+    """Routes requests to the owning fake server's `handle(method, path, body, headers)`."""
+
+    def _dispatch(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        status, headers, payload = self.server.owner.handle(method, self.path, body, self.headers)
+        if isinstance(payload, (dict, list)):
+            payload = json.dumps(payload).encode("utf-8")
+            headers = {"Content-Type": "application/json", **headers}
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def log_message(self, *args):
+        pass  # Keep test output quiet
+
+class FakeServer:
+    """Threaded HTTP server on 127.0.0.1 with a random free port."""
+
+    def __enter__(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.owner = self
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle(self, method, path, body, headers):
+        return 404, {}, {"error": {"message": f"No route for {method} {path}"}}
+
+class FakeOpenAIServer(FakeServer):
+    """Fake OpenAI API: chat completions (with optional latency and injected 429/5xx failures)
+    plus the files + batches endpoints used by batch mode.
+
+    A batch moves validating -> in_progress -> completed over `batch_polls` retrieves;
+    `batch_fail_rate` turns that share of its lines into entries in the error file.
+    """
+
+    def __init__(self, content='{"score": 7}', latency=0.0, fail_rate=0.0, fail_status=429, seed=0,
+                 batch_polls=2, batch_fail_rate=0.0):
+        self.batch_polls = batch_polls
+        self.batch_fail_rate = batch_fail_rate
+        self.files = {}
+        self.batches = {}
+        self.content = content
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.bodies = []
+
+    @property
+    def base_url(self):
+        return f"{self.url}/v1"
+
+    def completion(self, body):
+        """A chat.completion object for a request body (dict)."""
+        prompt = " ".join(m.get("content", "") for m in body.get("messages", []))
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = max(1, len(self.content) // 4)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def handle(self, method, path, body, headers):
+        if method == "POST" and path.endswith("/chat/completions"):
+            request = json.loads(body or b"{}")
+            with self.lock:
+                self.calls += 1
+                self.bodies.append(request)
+                fail = self.rng.random() < self.fail_rate
+                if fail:
+                    self.failures += 1
+            if self.latency:
+                time.sleep(self.latency)
+            if fail:
+                return self.fail_status, {"Retry-After": "0"}, {"error": {"message": "Injected failure", "type": "fake"}}
+            return 200, {}, self.completion(request)
+        route = urlsplit(path).path
+        if method == "POST" and route == "/v1/files":
+            return 200, {}, self._upload(body, headers)
+        if method == "GET" and route.startswith("/v1/files/") and route.endswith("/content"):
+            file_id = route[len("/v1/files/"):-len("/content")]
+            if file_id not in self.files:
+                return 404, {}, {"error": {"message": "No such file"}}
+            return 200, {"Content-Type": "application/octet-stream"}, self.files[file_id]["data"]
+        if method == "POST" and route == "/v1/batches":
+            return 200, {}, self._create_batch(json.loads(body or b"{}"))
+        if method == "GET" and route.startswith("/v1/batches/"):
+            batch_id = route[len("/v1/batches/"):]
+            if batch_id not in self.batches:
+                return 404, {}, {"error": {"message": "No such batch"}}
+            return 200, {}, self._advance_batch(batch_id)
+        return super().handle(method, path, body, headers)
+
+    # --- Batch API ---
+    def _store_file(self, data, filename, purpose):
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        self.files[file_id] = {
+            "id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+            "filename": filename, "purpose": purpose, "status": "processed", "data": data,
+        }
+        return file_id
+
+    def _upload(self, body, headers):
+        message = BytesParser().parsebytes(b"Content-Type: " + headers.get("Content-Type", "").encode() + b"\r\n\r\n" + body)
+        fields = {}
+        for part in message.get_payload():
+            name = part.get_param("name", header="content-disposition")
+            fields[name] = (part.get_filename(), part.get_payload(decode=True))
+        filename, data = fields.get("file", ("input.jsonl", b""))
+        purpose = fields.get("purpose", (None, b"batch"))[1].decode()
+        file_id = self._store_file(data, filename, purpose)
+        return {k: v for k, v in self.files[file_id].items() if k != "data"}
+
+    def _create_batch(self, request):
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        lines = [json.loads(l) for l in self.files[request["input_file_id"]]["data"].splitlines() if l.strip()]
+        self.batches[batch_id] = {
+            "id": batch_id, "object": "batch", "endpoint": request.get("endpoint"),
+            "input_file_id": request["input_file_id"], "completion_window": request.get("completion_window", "24h"),
+            "status": "validating", "created_at": int(time.time()), "output_file_id": None, "error_file_id": None,
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+            "_lines": lines, "_polls": 0,
+        }
+        return self._public(batch_id)
+
+    def _advance_batch(self, batch_id):
+        batch = self.batches[batch_id]
+        batch["_polls"] += 1
+        if batch["status"] == "validating":
+            batch["status"] = "in_progress"
+        elif batch["status"] == "in_progress" and batch["_polls"] >= self.batch_polls:
+            ok, failed = [], []
+            for line in batch["_lines"]:
+                with self.lock:
+                    self.calls += 1
+                    fail = self.rng.random() < self.batch_fail_rate
+                if fail:
+                    failed.append({"id": f"batch_req_{uuid.uuid4().hex[:8]}", "custom_id": line["custom_id"], "response": None,
+                                   "error": {"code": "server_error", "message": "Injected failure"}})
+                else:
+                    ok.append({"id": f"batch_req_{uuid.uuid4().hex[:8]}", "custom_id": line["custom_id"], "error": None,
+                               "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": self.completion(line["body"])}})
+            to_jsonl = lambda items: "".join(json.dumps(i) + "\n" for i in items).encode("utf-8")
+            batch["output_file_id"] = self._store_file(to_jsonl(ok), "output.jsonl", "batch_output") if ok else None
+            batch["error_file_id"] = self._store_file(to_jsonl(failed), "errors.jsonl", "batch_output") if failed else None
+            batch["request_counts"] = {"total": len(batch["_lines"]), "completed": len(ok), "failed": len(failed)}
+            batch["status"] = "completed"
+        return self._public(batch_id)
+
+    def _public(self, batch_id):
+        return {k: v for k, v in self.batches[batch_id].items() if not k.startswith("_")}
+
+class FakeGitHubServer(FakeServer):
+    """Fake of the GitHub REST endpoints GitHubReader uses (repo, trees, contents, blobs), plus
+    contents PUT for config writes.
+
+    Honours If-None-Match with 304s and, like GitHub, leaves `content` empty for
+    files above `inline_limit` so callers must fall back to the blob API. A PUT
+    whose `sha` is not the file's current blob SHA gets a 409 (422 if the file
+    exists and no sha was sent), as on GitHub. A recursive tree longer than
+    `tree_limit` entries is cut short and flagged `truncated`, as GitHub does.
+    """
+
+    def __init__(self, files, repo_name="acme/geo", branch="main", inline_limit=1024 * 1024, tree_limit=None):
+        self.files = {path: (data.encode("utf-8") if isinstance(data, str) else data) for path, data in files.items()}
+        self.repo_name = repo_name
+        self.branch = branch
+        self.inline_limit = inline_limit
+        self.tree_limit = tree_limit
+        self.lock = threading.Lock()
+        self.calls = []
+        self.writes = []
+        self.not_modified = 0
+
+    @staticmethod
+    def blob_sha(data):
+        return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+    def _tree(self, recursive):
+        blobs = {path: self.blob_sha(data) for path, data in self.files.items()}
+        dirs = {}
+        for path, sha in blobs.items():
+            parts = path.split("/")
+            for i in range(1, len(parts)):
+                dirs.setdefault("/".join(parts[:i]), []).append(sha)
+        entries = [{"path": p, "type": "blob", "sha": sha, "size": len(self.files[p])} for p, sha in blobs.items()]
+        entries += [{"path": d, "type": "tree", "sha": hashlib.sha1("".join(sorted(shas)).encode()).hexdigest()}
+                    for d, shas in dirs.items()]
+        if not recursive:
+            entries = [e for e in entries if "/" not in e["path"]]
+        entries = sorted(entries, key=lambda e: e["path"])
+        truncated = self.tree_limit is not None and len(entries) > self.tree_limit
+        return {"sha": hashlib.sha1(json.dumps(sorted(blobs.items())).encode()).hexdigest(),
+                "tree": entries[:self.tree_limit] if truncated else entries, "truncated": truncated}
+
+    def _json(self, payload, headers):
+        body = json.dumps(payload).encode("utf-8")
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            return 304, {"ETag": etag}, b""
+        return 200, {"ETag": etag, "Content-Type": "application/json"}, body
+
+    def handle(self, method, path, body, headers):
+        parts = urlsplit(path)
+        query = parse_qs(parts.query)
+        prefix = f"/repos/{self.repo_name}"
+        route = unquote(parts.path)
+        with self.lock:
+            self.calls.append((method, route))
+        if method not in ("GET", "PUT") or not route.startswith(prefix):
+            return super().handle(method, path, body, headers)
+        route = route[len(prefix):]
+        if method == "PUT" and route.startswith("/contents/"):
+            return self._put_file(route[len("/contents/"):], json.loads(body or b"{}"))
+        if method != "GET":
+            return super().handle(method, path, body, headers)
+        if route in ("", "/"):
+            return self._json({"full_name": self.repo_name, "default_branch": self.branch}, headers)
+        if route == f"/git/trees/{self.branch}":
+            return self._json(self._tree(bool(query.get("recursive"))), headers)
+        if route.startswith("/contents/"):
+            file_path = route[len("/contents/"):]
+            data = self.files.get(file_path)
+            if data is None:
+                return 404, {}, {"message": "Not Found"}
+            inline = len(data) <= self.inline_limit
+            return self._json({
+                "type": "file", "path": file_path, "sha": self.blob_sha(data), "size": len(data),
+                "encoding": "base64" if inline else "none",
+                "content": base64.b64encode(data).decode("ascii") if inline else "",
+            }, headers)
+        if route.startswith("/git/blobs/"):
+            sha = route[len("/git/blobs/"):]
+            data = next((d for d in self.files.values() if self.blob_sha(d) == sha), None)
+            if data is None:
+                return 404, {}, {"message": "Not Found"}
+            if "raw" in headers.get("Accept", ""):
+                return 200, {"Content-Type": "application/octet-stream"}, data
+            return 200, {}, {"sha": sha, "size": len(data), "encoding": "base64",
+                             "content": base64.b64encode(data).decode("ascii")}
+        return super().handle(method, path, body, headers)
+
+    def _put_file(self, file_path, request):
+        with self.lock:
+            current = self.files.get(file_path)
+            if current is not None and not request.get("sha"):
+                return 422, {}, {"message": "Invalid request. \"sha\" wasn't supplied."}
+            if current is not None and request["sha"] != self.blob_sha(current):
+                return 409, {}, {"message": f"{file_path} does not match {request['sha']}"}
+            data = base64.b64decode(request.get("content", ""))
+            self.files[file_path] = data
+            self.writes.append((file_path, request.get("message")))
+        sha = self.blob_sha(data)
+        return (201 if current is None else 200), {}, {
+            "content": {"type": "file", "name": file_path.rsplit("/", 1)[-1], "path": file_path, "sha": sha, "size": len(data)},
+            "commit": {"sha": hashlib.sha1(sha.encode() + str(len(self.writes)).encode()).hexdigest(), "message": request.get("message")},
+        }
+
+class _Usage(dict):
+    def __getattr__(self, name):
+        return self[name]
+
+    def model_dump(self):
+        return dict(self)
+
+class _Namespace:
+    def __init__(self, **kw):
+        self.__dict__.update(kw)
+
+class FakeAsyncOpenAI:
+    """In-process AsyncOpenAI stand-in (no HTTP): measures engine overhead rather than the network."""
+
+    def __init__(self, content='{"score": 7}', latency=0.0):
+        self.content = content
+        self.latency = latency
+        self.calls = 0
+        self.chat = _Namespace(completions=_Namespace(create=self._create))
+
+    async def _create(self, **request):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        message = _Namespace(role="assistant", content=self.content)
+        usage = _Usage(prompt_tokens=12, completion_tokens=4, total_tokens=16)
+        return _Namespace(choices=[_Namespace(index=0, message=message, finish_reason="stop")], usage=usage,
+                          model=request.get("model"))
+
+    async def close(self):
+        pass
@@ -0,0 +1,166 @@
+"""LLM engines the audit can fan out to, behind one small async interface.
+
+Each provider turns a chat.completions-style request into (content, usage).
+call_provider() adds the per-provider timeout and optional hedging: when a call
+has not answered by that provider's observed p95 latency, a backup request is
+fired and whichever finishes first wins.
+"""
+import asyncio
+import os
+import random
+import statistics
+import time
+from collections import defaultdict, deque
+
+PROVIDER_TIMEOUT = float(os.environ.get("AUDIT_PROVIDER_TIMEOUT", 60))  # Seconds, unless overridden per provider
+HEDGE_MIN_SAMPLES = 20  # Latencies needed before the p95 is trusted enough to hedge on
+
+def usage_dict(response):
+    """Token usage of an OpenAI completion as a plain dict."""
+    usage = getattr(response, "usage", None)
+    return usage.model_dump() if usage is not None else None
+
+class Provider:
+    """Base class: `name` tags the rows it produces; `model` (if set) replaces the request's model."""
+
+    name = "provider"
+
+    def __init__(self, model=None, timeout=None):
+        self.model = model
+        self.timeout = timeout or float(os.environ.get(f"AUDIT_{self.name.upper()}_TIMEOUT", PROVIDER_TIMEOUT))
+
+    def prepare(self, request):
+        """The request as this provider will send it (used for the cache key too)."""
+        return {**request, "model": self.model} if self.model else dict(request)
+
+    async def complete(self, request):
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+class OpenAIProvider(Provider):
+    name = "openai"
+
+    def __init__(self, client, model=None, timeout=None):
+        super().__init__(model, timeout)
+        self.client = client
+
+    async def complete(self, request):
+        response = await self.client.chat.completions.create(**request)
+        return response.choices[0].message.content, usage_dict(response)
+
+    async def aclose(self):
+        await self.client.close()
+
+class GeminiProvider(Provider):
+    name = "gemini"
+
+    def __init__(self, api_key=None, model="gemini-1.5-flash", timeout=None):
+        super().__init__(model, timeout)
+        import google.generativeai as genai  # Only needed when Gemini is enabled
+        genai.configure(api_key=api_key or os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY"))
+        self.genai = genai
+
+    async def complete(self, request):
+        prompt = "\n\n".join(m.get("content", "") for m in request.get("messages", []))
+        json_mode = (request.get("response_format") or {}).get("type") == "json_object"
+        model = self.genai.GenerativeModel(
+            request["model"],
+            generation_config={"response_mime_type": "application/json"} if json_mode else None,
+        )
+        response = await model.generate_content_async(prompt)
+        meta = getattr(response, "usage_metadata", None)
+        usage = None
+        if meta is not None:
+            usage = {"prompt_tokens": meta.prompt_token_count, "completion_tokens": meta.candidates_token_count,
+                     "total_tokens": meta.total_token_count}
+        return response.text, usage
+
+class StubProvider(Provider):
+    """Local stand-in for tests: fixed/callable reply, configurable latency and failure rate."""
+
+    def __init__(self, name="stub", content='{"score": 7}', latency=0.0, fail_rate=0.0, timeout=None, seed=0):
+        self.name = name
+        super().__init__(None, timeout)
+        self.content = content
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    async def complete(self, request):
+        self.calls += 1
+        delay = self.latency() if callable(self.latency) else self.latency
+        await asyncio.sleep(delay)
+        if self.rng.random() < self.fail_rate:
+            raise ConnectionError(f"{self.name}: injected failure")
+        content = self.content(request) if callable(self.content) else self.content
+        return content, {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per provider."""
+
+    def __init__(self, window=200):
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, name, seconds):
+        self.samples[name].append(seconds)
+
+    def p95(self, name):
+        data = self.samples[name]
+        if len(data) < HEDGE_MIN_SAMPLES:
+            return None
+        return statistics.quantiles(data, n=20)[-1]
+
+async def call_provider(provider, request, tracker=None, hedge=False, acquire=None):
+    """One logical call with the provider's timeout; hedged after its p95 when `hedge` is on.
+
+    `acquire` is awaited before the hedge is sent, so the backup request pays into the
+    same rate limit as the first; the hedge is dropped if the first call returns meanwhile.
+    Returns (content, usage, hedged).
+    """
+    started = time.monotonic()
+    tasks = [asyncio.ensure_future(asyncio.wait_for(provider.complete(request), provider.timeout))]
+    hedged = False
+    delay = tracker.p95(provider.name) if (hedge and tracker) else None
+    if delay is not None:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done and acquire:
+            await acquire()
+            done = [t for t in tasks if t.done()]
+        if not done:
+            hedged = True
+            tasks.append(asyncio.ensure_future(asyncio.wait_for(provider.complete(request), provider.timeout)))
+
+    error = None
+    try:
+        while tasks:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                tasks.remove(task)
+                if task.exception() is None:
+                    if tracker:
+                        tracker.record(provider.name, time.monotonic() - started)
+                    content, usage = task.result()
+                    return content, usage, hedged
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def build_providers(names, openai_client=None):
+    """Providers for a comma-separated list such as "openai,gemini"."""
+    providers = []
+    for name in [n.strip().lower() for n in names.split(",") if n.strip()]:
+        if name == "openai":
+            if openai_client is None:
+                from openai import AsyncOpenAI
+                openai_client = AsyncOpenAI(max_retries=0)
+            providers.append(OpenAIProvider(openai_client))
+        elif name == "gemini":
+            providers.append(GeminiProvider())
+        else:
+            raise ValueError(f"Unknown provider: {name}")
+    return providers
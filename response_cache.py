@@ -0,0 +1,119 @@
+"""On-disk LLM response cache and per-run checkpoints, so a failed audit can resume.
+
+Layout under AUDIT_CACHE_DIR (default .audit_cache/):
+    responses/<ab>/<sha256>.json   one cached reply per (model, prompt, response_format, date bucket)
+    checkpoints/<run_key>.jsonl    rows of targets already finished in an interrupted run
+    batch/state.json               the submitted batch a re-run resumes (see batch_audit.py)
+"""
+import datetime
+import hashlib
+import json
+import os
+import time
+
+CACHE_DIR = os.environ.get("AUDIT_CACHE_DIR", ".audit_cache")
+CACHE_RETENTION_DAYS = float(os.environ.get("AUDIT_CACHE_RETENTION_DAYS", 7))
+
+def _atomic_write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def request_key(request, bucket=None):
+    """Content address of a chat request within a date bucket (today by default)."""
+    payload = {
+        "model": request.get("model"),
+        "messages": request.get("messages"),
+        "response_format": request.get("response_format"),
+        "bucket": bucket or datetime.date.today().isoformat(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def target_key(target, engine=None):
+    """Stable id for a config target (per engine when the audit fans out)."""
+    payload = {**target, "_engine": engine} if engine else target
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """Content-addressed reply cache. `refresh=True` skips reads (replies are still stored)."""
+
+    def __init__(self, root=CACHE_DIR, retention_days=CACHE_RETENTION_DAYS, refresh=False, bucket=None):
+        self.root = root
+        self.retention_days = retention_days
+        self.refresh = refresh
+        self.bucket = bucket
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.root, "responses", key[:2], f"{key}.json")
+
+    def get(self, request):
+        """Cached {"content", "usage"} for a request, or None."""
+        if not self.refresh:
+            try:
+                with open(self._path(request_key(request, self.bucket))) as f:
+                    entry = json.load(f)
+                self.hits += 1
+                return entry
+            except (OSError, ValueError):
+                pass
+        self.misses += 1
+        return None
+
+    def put(self, request, content, usage=None):
+        entry = {"created": time.time(), "model": request.get("model"), "content": content, "usage": usage}
+        _atomic_write(self._path(request_key(request, self.bucket)), json.dumps(entry))
+
+    def evict(self):
+        """Deletes replies and checkpoints older than the retention window. Returns the number removed."""
+        cutoff = time.time() - self.retention_days * 86400
+        removed = 0
+        for sub in ("responses", "checkpoints"):
+            for root, _, files in os.walk(os.path.join(self.root, sub)):
+                for name in files:
+                    path = os.path.join(root, name)
+                    try:
+                        if os.path.getmtime(path) < cutoff:
+                            os.remove(path)
+                            removed += 1
+                    except OSError:
+                        pass
+        return removed
+
+class Checkpoint:
+    """Append-only log of finished target rows for one run; re-runs skip targets already in it."""
+
+    def __init__(self, root=CACHE_DIR, run_key=None):
+        run_key = run_key or datetime.date.today().isoformat()
+        self.path = os.path.join(root, "checkpoints", f"{run_key}.jsonl")
+
+    def load(self):
+        """{target_key: row} for targets finished by an earlier attempt of this run."""
+        done = {}
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # A torn last line from a killed process
+                    done[entry["target"]] = entry["row"]
+        except OSError:
+            pass
+        return done
+
+    def record(self, key, row):
+        """Appends a finished row under its target_key()."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps({"target": key, "row": row}, default=str) + "\n")
+            f.flush()
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
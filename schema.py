@@ -0,0 +1,55 @@
+"""Declared dtypes for history and the store tables, applied once when a frame is loaded.
+
+Repeated labels (brand, category, use case, run id...) load as categoricals,
+rank/distance as fixed-width floats and dates as datetime64, so loaded frames
+stay small and callers never re-coerce. Builders and writers still accept
+untyped frames (e.g. a fresh run's rows).
+"""
+import pandas as pd
+
+HISTORY_SCHEMA = {
+    "date": "datetime", "run_id": "category", "brand": "category", "category": "category",
+    "use_case": "category", "type": "category", "engine": "category",
+    "rank": "float32", "total_distance": "float32",
+}
+
+SCHEMAS = {
+    "history": HISTORY_SCHEMA,
+    "vectors": {
+        "date": "datetime", "run_id": "category", "category": "category", "use_case": "category",
+        "brand": "category", "vector": "category", "score": "float32", "weight": "float32",
+    },
+    "rollups": {
+        "date": "datetime", "category": "category", "use_case": "category", "brand": "category", "type": "category",
+    },
+    "sources": {
+        "date": "datetime", "category": "category", "use_case": "category", "run_id": "category",
+        "vector": "category", "domain": "category", "weight": "float32",
+    },
+    "trends": {
+        "date": "datetime", "category": "category", "use_case": "category", "brand": "category", "type": "category",
+    },
+}
+
+def apply_schema(df, table="history"):
+    """Casts the columns `table` declares, in place (others are left alone). Bad numbers/dates become NaN/NaT."""
+    for col, dtype in SCHEMAS.get(table, {}).items():
+        if col not in df.columns:
+            continue
+        if dtype == "datetime":
+            if not pd.api.types.is_datetime64_any_dtype(df[col]):
+                # "mixed": files written before dates were normalised hold both 2026-01-06 and 2026-01-06 00:00:00
+                df[col] = pd.to_datetime(df[col], errors="coerce", format="mixed")
+        elif dtype == "category":
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype("category")
+        elif df[col].dtype != dtype:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(dtype)
+    return df
+
+def plain_columns(df):
+    """Copy with categoricals turned back into their values, for writers that mix old and new parts."""
+    cats = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    if not cats:
+        return df.copy()
+    return df.astype({c: df[c].cat.categories.dtype for c in cats})
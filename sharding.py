@@ -0,0 +1,100 @@
+"""Sharded audits: split the targets across processes or CI jobs, then merge their rows once.
+
+    python daily_audit.py --shard 3/8        # audit shard 3 of 8 -> shards/shard-03-of-08.parquet
+    python daily_audit.py --merge-shards     # combine every shard file and save the run
+    python daily_audit.py --workers 8        # both steps locally, one process per shard
+
+A target's shard comes from its target_key() hash, so every job computes the
+same plan from the same config without talking to the others. Shard files
+carry each row's position in the full target list; merging sorts on it, so
+the merged rows come out in the same order an unsharded run would produce.
+"""
+import glob
+import os
+import re
+import pandas as pd
+from response_cache import target_key
+
+SHARD_DIR = os.environ.get("AUDIT_SHARD_DIR", "shards")
+SHARD_FILE = re.compile(r"shard-(\d+)-of-(\d+)\.parquet$")
+
+def parse_shard(spec):
+    """'3/8' -> (3, 8). Shards are 1-based."""
+    try:
+        index, count = (int(p) for p in str(spec).split("/"))
+    except ValueError:
+        raise ValueError(f"Shard must look like INDEX/COUNT (e.g. 3/8), got {spec!r}")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Shard index must be between 1 and {count}, got {spec!r}")
+    return index, count
+
+def shard_of(target, count):
+    """1-based shard of a target (stable across processes, machines and Python versions)."""
+    return int(target_key(target)[:12], 16) % count + 1
+
+def plan_shards(targets, count):
+    """{shard: [(position in targets, target), ...]} for shards 1..count (empty shards included)."""
+    plan = {i: [] for i in range(1, count + 1)}
+    for pos, target in enumerate(targets):
+        plan[shard_of(target, count)].append((pos, target))
+    return plan
+
+def shard_path(index, count, shard_dir=SHARD_DIR):
+    return os.path.join(shard_dir, f"shard-{index:02d}-of-{count:02d}.parquet")
+
+def _slot(d):
+    return (d.get("brand"), d.get("category"), d.get("use_case"))
+
+def write_shard(rows, planned, index, count, shard_dir=SHARD_DIR):
+    """Writes one shard's rows tagged with their target's position; `planned` is plan_shards()[index].
+
+    Written even when there are no rows, so the merge can tell an empty shard from a missing one.
+    """
+    positions = {}
+    for pos, target in planned:
+        positions.setdefault(_slot(target), pos)
+    df = pd.DataFrame(rows)
+    if "date" in df.columns:
+        # Rows resumed from a checkpoint carry the date as text, fresh ones as datetime.date
+        df["date"] = df["date"].astype(str)
+    df["_target"] = [positions.get(_slot(r), -1) for r in rows]
+    df["_seq"] = range(len(df))
+    path = shard_path(index, count, shard_dir)
+    os.makedirs(shard_dir, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)  # A retried shard job replaces its earlier file instead of adding to it
+    return path
+
+def shard_files(shard_dir=SHARD_DIR):
+    """{count: {index: path}} for the shard files present."""
+    found = {}
+    for path in glob.glob(os.path.join(shard_dir, "**", "shard-*-of-*.parquet"), recursive=True):
+        m = SHARD_FILE.search(os.path.basename(path))
+        if m:
+            found.setdefault(int(m.group(2)), {})[int(m.group(1))] = path
+    return found
+
+def merge_shards(shard_dir=SHARD_DIR, count=None):
+    """(rows of every shard in target order with duplicates dropped, files read).
+
+    Raises ValueError if shard files of different counts are mixed or any shard
+    of the plan is missing, so a partial run is never saved as complete.
+    """
+    found = shard_files(shard_dir)
+    if count is None:
+        if len(found) > 1:
+            raise ValueError(f"Shard files from different plans in {shard_dir}: {sorted(found)} shards")
+        count = next(iter(found), None)
+    files = found.get(count, {})
+    missing = [i for i in range(1, (count or 0) + 1) if i not in files]
+    if not files or missing:
+        raise ValueError(f"Missing shard files in {shard_dir}: {missing or 'all'}")
+    paths = [files[i] for i in sorted(files)]
+    frames = [pd.read_parquet(p) for p in paths]
+    df = pd.concat([f for f in frames if not f.empty] or [pd.DataFrame(columns=["_target", "_seq"])], ignore_index=True)
+    df = df.sort_values(["_target", "_seq"], kind="stable")
+    # One row per target and engine: a target listed twice in the config shares one position
+    dedupe = ["_target"] + [c for c in ("brand", "category", "use_case", "engine") if c in df.columns]
+    df = df.drop_duplicates(dedupe, keep="first")
+    return df.drop(columns=["_target", "_seq"]).reset_index(drop=True), paths
@@ -0,0 +1,790 @@
+"""Config and history I/O without Streamlit: local checkout first, then the GitHub API.
+
+The audit job and scripts import this directly; the dashboard goes through
+github_utils, which adds Streamlit secrets and shows errors in the app.
+"""
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import csv
+import json
+import os
+import re
+import random
+import base64
+import glob
+import shutil
+import uuid
+import copy
+import time
+import threading
+from io import BytesIO, StringIO
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, unquote
+import requests
+from requests.adapters import HTTPAdapter
+from schema import apply_schema, plain_columns
+
+# 1. AUTHENTICATION SETUP (environment; see configure() for other sources)
+GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
+REPO_NAME = os.environ.get("REPO_NAME") or "j-b-agent-c/geo-enterprise"  # Fallback
+
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")  # Point at a mock server in tests
+GITHUB_POOL_SIZE = int(os.environ.get("GITHUB_POOL_SIZE", 10))
+
+# 2. HISTORY STORAGE SETUP
+# "parquet": store/<table>/category=<c>/use_case=<u>/month=<m>/part-*.parquet (history.csv kept as export)
+# "csv": legacy single-file history.csv, rewritten on every save
+HISTORY_BACKEND = os.environ.get("HISTORY_BACKEND", "parquet")
+STORE_DIR = os.environ.get("HISTORY_STORE", "store")
+STORE_COMPACT_PARTS = int(os.environ.get("STORE_COMPACT_PARTS", 8))  # Parts a month folder collects before they are merged
+
+# 3. CACHE SETUP
+CACHE_TTL = float(os.environ.get("GEO_CACHE_TTL", 60))  # Seconds a cached read is trusted without any check
+CACHE_MAX_ENTRIES = int(os.environ.get("GEO_CACHE_MAX_ENTRIES", 128))  # Parsed files/slices kept; least recently used go first
+
+# 4. CONFIG WRITES
+CONFIG_MAX_RETRIES = int(os.environ.get("CONFIG_MAX_RETRIES", 8))  # Re-read + re-apply attempts when config.json moved
+
+# --- GITHUB CLIENTS (one pool per process) ---
+_GITHUB = None
+_REPO = None
+_READER = None
+_CLIENT_LOCK = threading.Lock()
+
+def configure(token=None, repo_name=None):
+    """Sets credentials found after import (e.g. Streamlit secrets) and drops clients built with the old ones."""
+    global GITHUB_TOKEN, REPO_NAME, _GITHUB, _REPO, _READER
+    with _CLIENT_LOCK:
+        GITHUB_TOKEN = token or GITHUB_TOKEN
+        REPO_NAME = repo_name or REPO_NAME
+        _GITHUB = _REPO = _READER = None
+
+def get_github():
+    """Returns the shared PyGithub client (used for writes; imported on first use)."""
+    global _GITHUB
+    if not GITHUB_TOKEN:
+        return None
+    with _CLIENT_LOCK:
+        if _GITHUB is None:
+            from github import Github, Auth
+            _GITHUB = Github(auth=Auth.Token(GITHUB_TOKEN), base_url=GITHUB_API_URL, pool_size=GITHUB_POOL_SIZE)
+        return _GITHUB
+
+def get_repo():
+    """Authenticates and returns the repository object (fetched once per process)."""
+    global _REPO
+    if _REPO is not None:
+        return _REPO
+    g = get_github()
+    if not g:
+        return None
+    try:
+        _REPO = g.get_repo(REPO_NAME)
+        return _REPO
+    except Exception as e:
+        print(f"❌ Error connecting to GitHub: {e}")
+        return None
+
+class TruncatedTreeError(RuntimeError):
+    """The recursive tree listing hit GitHub's size limit and is incomplete."""
+
+class GitHubReader:
+    """Read-only REST client: keep-alive session, ETag-conditional GETs and streamed blob downloads."""
+
+    CONTENTS_INLINE_LIMIT = 1024 * 1024  # The contents API stops inlining file bodies above ~1 MB
+
+    def __init__(self, token, repo_name, api_url=GITHUB_API_URL, pool_size=GITHUB_POOL_SIZE):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+        })
+        self.base = f"{api_url.rstrip('/')}/repos/{repo_name}"
+        self.etags = {}  # url -> (etag, parsed body)
+        self.not_modified = 0
+        self._branch = None
+
+    def get_json(self, path, **params):
+        """GET a JSON resource; a 304 answer reuses the body cached under its ETag."""
+        req = requests.Request("GET", f"{self.base}/{path}".rstrip("/"), params=params).prepare()
+        cached = self.etags.get(req.url)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        resp = self.session.get(req.url, headers=headers, timeout=30)
+        if resp.status_code == 304 and cached:
+            self.not_modified += 1
+            return cached[1]
+        resp.raise_for_status()
+        data = resp.json()
+        if resp.headers.get("ETag"):
+            self.etags[req.url] = (resp.headers["ETag"], data)
+        return data
+
+    def default_branch(self):
+        if self._branch is None:
+            self._branch = self.get_json("").get("default_branch", "main")
+        return self._branch
+
+    def tree(self, recursive=False):
+        """Tree entries of the default branch (one call; conditional on its ETag).
+
+        Raises TruncatedTreeError when GitHub cut the listing short, so callers never work from part of it.
+        """
+        params = {"recursive": 1} if recursive else {}
+        data = self.get_json(f"git/trees/{quote(self.default_branch(), safe='')}", **params)
+        if data.get("truncated"):
+            raise TruncatedTreeError(f"GitHub truncated the tree of {self.base} at {len(data.get('tree', []))} entries; "
+                                     "compact the store or read it from a checkout")
+        return data.get("tree", [])
+
+    def open_blob(self, sha):
+        """Streams a blob's raw bytes as a file-like object (no base64/JSON copy)."""
+        resp = self.session.get(f"{self.base}/git/blobs/{sha}", headers={"Accept": "application/vnd.github.raw"},
+                                stream=True, timeout=60)
+        resp.raise_for_status()
+        resp.raw.decode_content = True
+        return resp.raw
+
+    def open_file(self, path):
+        """File-like view of a file: inline contents when small, streamed blob above the inline limit."""
+        meta = self.get_json(f"contents/{quote(path)}")
+        if meta.get("encoding") == "base64" and meta.get("content"):
+            return BytesIO(base64.b64decode(meta["content"]))
+        return self.open_blob(meta["sha"])
+
+def get_reader():
+    """Returns the shared GitHubReader, or None without a token."""
+    global _READER
+    if not GITHUB_TOKEN:
+        return None
+    with _CLIENT_LOCK:
+        if _READER is None:
+            _READER = GitHubReader(GITHUB_TOKEN, REPO_NAME, api_url=GITHUB_API_URL)
+        return _READER
+
+# --- CACHE ---
+class BlobCache:
+    """Process-wide cache of parsed files, keyed on a fingerprint of their content.
+
+    Within `ttl` seconds of the last check a read is served straight from memory.
+    After that one cheap fingerprint check (local stat / git tree SHA) decides
+    between reusing the value and reloading it. Writers call invalidate().
+    Loads run under a per-key lock, so a slow load only holds up readers of the
+    same key; the least recently used entries go once there are `max_entries`.
+    """
+
+    def __init__(self, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (fingerprint, value, checked_at), least recently used first
+        self.key_locks = {}
+        self.generation = 0  # Bumped by every invalidation; a load that overlapped one is not kept
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.lock = threading.Lock()  # Guards the dicts and counters only; never held while loading
+
+    def _fresh(self, key, now):
+        entry = self.entries.get(key)
+        if entry and now - entry[2] < self.ttl:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+        return None
+
+    def get(self, key, fingerprint_fn, loader):
+        with self.lock:
+            entry = self._fresh(key, time.monotonic())
+            if entry:
+                return entry[1]
+            key_lock = self.key_locks.setdefault(key, threading.RLock())  # Re-entrant: loaders may read other keys
+        with key_lock:
+            with self.lock:
+                # Another reader may have loaded it while this one waited
+                entry = self._fresh(key, time.monotonic())
+                if entry:
+                    return entry[1]
+                entry = self.entries.get(key)
+                generation = self.generation
+            fingerprint = fingerprint_fn()
+            if entry and fingerprint is not None and fingerprint == entry[0]:
+                value = entry[1]
+                with self.lock:
+                    self.hits += 1
+                    self.revalidations += 1
+            else:
+                value = loader()
+                with self.lock:
+                    self.misses += 1
+            with self.lock:
+                if generation == self.generation:
+                    self._store(key, (fingerprint, value, time.monotonic()))
+            return value
+
+    def _store(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            old, _ = self.entries.popitem(last=False)
+            self.key_locks.pop(old, None)
+            self.evictions += 1
+
+    def invalidate(self, *keys):
+        with self.lock:
+            self.generation += 1
+            for key in keys or list(self.entries):
+                self.entries.pop(key, None)
+                self.key_locks.pop(key, None)
+
+    def invalidate_prefix(self, name):
+        """Drops `name` and every "name:…" entry (a table plus its index and slices)."""
+        with self.lock:
+            self.generation += 1
+            for key in [k for k in self.entries if k == name or k.startswith(f"{name}:")]:
+                del self.entries[key]
+                self.key_locks.pop(key, None)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "revalidations": self.revalidations,
+                "evictions": self.evictions, "entries": len(self.entries), "max_entries": self.max_entries,
+                "ttl": self.ttl}
+
+_CACHE = BlobCache()
+
+def cache_stats():
+    """Hit/miss counters for the config/history cache."""
+    return _CACHE.stats()
+
+def invalidate_cache(*keys):
+    """Drops cached reads (all of them if no keys are given)."""
+    _CACHE.invalidate(*keys)
+
+def _local_signature(path):
+    if os.path.isdir(path):
+        sig = []
+        for root, _, files in os.walk(path):
+            for name in files:
+                st_ = os.stat(os.path.join(root, name))
+                sig.append((os.path.join(root, name), st_.st_mtime_ns, st_.st_size))
+        return tuple(sorted(sig))
+    st_ = os.stat(path)
+    return (path, st_.st_mtime_ns, st_.st_size)
+
+def _remote_shas():
+    """Top-level blob/tree SHAs of the default branch, from one conditional API call."""
+    reader = get_reader()
+    if not reader: return None
+    return {e["path"]: e["sha"] for e in reader.tree()}
+
+def _fingerprint(*paths):
+    """Cheap "has it changed?" check mirroring the loaders: local stat if checked out, else git SHAs."""
+    try:
+        local = [p for p in paths if os.path.exists(p)]
+        if local:
+            return ("local",) + tuple(_local_signature(p) for p in local)
+        shas = _remote_shas()
+        if shas is None: return None
+        return ("remote",) + tuple(shas.get(p.replace(os.sep, "/").split("/")[0]) for p in paths)
+    except Exception:
+        return None
+
+def load_config():
+    """Loads targets from config.json (cached; see BlobCache)."""
+    targets = _CACHE.get("config.json", lambda: _fingerprint("config.json"), _load_config)
+    return copy.deepcopy(targets)  # Callers append to the list they get back
+
+def _load_config():
+    """Loads targets from config.json (Checks Local File First!)."""
+    # 1. Try Local File (Best for GitHub Action context)
+    if os.path.exists("config.json"):
+        try:
+            with open("config.json", "r") as f:
+                return json.load(f)
+        except:
+            pass
+
+    # 2. Try GitHub API (Best for Streamlit context)
+    try:
+        reader = get_reader()
+        if not reader: return []
+        
+        return json.load(reader.open_file("config.json"))
+    except Exception as e:
+        print(f"⚠️ Config Load Error: {e}")
+        return []
+
+# --- TARGET CONFIG ---
+# Edits are applied as a batch (adds, removals, optional reset) on top of the
+# config.json version they are committed against. The write carries that
+# version's blob SHA; if someone else committed in between, GitHub rejects it
+# and the batch is replayed on the new version (a merge), up to CONFIG_MAX_RETRIES.
+CONFIG_FIELDS = ["brand", "category", "use_case"]
+
+def target_id(target):
+    """Dedup key: brand / category / use case, trimmed and case-insensitive."""
+    return tuple(str(target.get(f) or "").strip().casefold() for f in CONFIG_FIELDS)
+
+class TargetIndex:
+    """Targets keyed on target_id, in insertion order (the first spelling of a duplicate wins)."""
+
+    def __init__(self, targets=()):
+        self.by_id = {}
+        for t in targets:
+            self.add(t)
+
+    def __contains__(self, target):
+        return target_id(target) in self.by_id
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def add(self, target):
+        """Adds target; False if an equivalent one is already indexed."""
+        key = target_id(target)
+        if key in self.by_id:
+            return False
+        self.by_id[key] = target
+        return True
+
+    def remove(self, target):
+        """Removes the equivalent target; False if there was none."""
+        return self.by_id.pop(target_id(target), None) is not None
+
+    def targets(self):
+        return list(self.by_id.values())
+
+def apply_config_edits(targets, add=(), remove=(), reset=False):
+    """(new target list, added, removed) after applying one batch of edits to `targets`."""
+    before = TargetIndex(targets)
+    index = TargetIndex(() if reset else targets)
+    for t in remove:
+        index.remove(t)
+    for t in add:
+        index.add(t)
+    added = sum(t not in before for t in index.targets())
+    removed = sum(t not in index for t in before.targets())
+    return index.targets(), added, removed
+
+def parse_targets(data, filename=""):
+    """Targets from an uploaded CSV or JSON file (bytes or text). Returns (targets, skipped rows).
+
+    CSV needs brand, category and use_case columns ("Use Case" works too); JSON
+    is a list of target objects (or {"targets": [...]}). Rows missing a field
+    are skipped; duplicates are left for TargetIndex to drop.
+    """
+    text = data.decode("utf-8-sig") if isinstance(data, bytes) else data
+    if filename.lower().endswith(".json") or text.lstrip().startswith(("[", "{")):
+        rows = json.loads(text)
+        rows = rows.get("targets", []) if isinstance(rows, dict) else rows
+    else:
+        rows = list(csv.DictReader(StringIO(text)))
+    targets, skipped = [], 0
+    for row in rows:
+        if not isinstance(row, dict):
+            skipped += 1
+            continue
+        row = {str(k).strip().lower().replace(" ", "_"): v for k, v in row.items() if k is not None}
+        target = {**row, **{f: str(row.get(f) or "").strip() for f in CONFIG_FIELDS}}
+        if not all(target[f] for f in CONFIG_FIELDS):
+            skipped += 1
+            continue
+        targets.append(target)
+    return targets, skipped
+
+def _read_remote_config(reader):
+    """(targets, blob SHA) of config.json on the default branch; ([], None) if it does not exist yet."""
+    try:
+        meta = reader.get_json("contents/config.json")
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return [], None
+        raise
+    if meta.get("encoding") == "base64" and meta.get("content"):
+        return json.loads(base64.b64decode(meta["content"])), meta["sha"]
+    return json.load(reader.open_blob(meta["sha"])), meta["sha"]
+
+def update_config(add=(), remove=(), reset=False, message="Update Tracker Config"):
+    """Commits one batch of target edits to config.json. Returns (added, removed).
+
+    Raises if the repository is unreachable or the write still conflicts after CONFIG_MAX_RETRIES.
+    """
+    from github import GithubException
+    repo, reader = get_repo(), get_reader()
+    if not repo or not reader:
+        raise RuntimeError("Cannot connect to repository. Check GITHUB_TOKEN.")
+
+    for attempt in range(1, CONFIG_MAX_RETRIES + 1):
+        current, sha = _read_remote_config(reader)
+        targets, added, removed = apply_config_edits(current, add, remove, reset)
+        if targets == current:
+            return added, removed  # Nothing to commit (e.g. every add was already tracked)
+        json_str = json.dumps(targets, indent=2)
+        try:
+            if sha:
+                repo.update_file(path="config.json", message=f"{message} (+{added} / -{removed})",
+                                 content=json_str, sha=sha)
+            else:
+                repo.create_file(path="config.json", message=f"{message} (+{added} / -{removed})",
+                                 content=json_str)
+            break
+        except GithubException as e:
+            # 409: SHA no longer current; 422: file created by someone else meanwhile
+            if e.status not in (409, 422) or attempt == CONFIG_MAX_RETRIES:
+                raise
+            print(f"🔁 config.json changed during save; merging and retrying ({attempt}/{CONFIG_MAX_RETRIES})")
+            time.sleep(random.uniform(0, min(4, 0.25 * 2 ** attempt)))  # Jittered backoff so racing writers spread out
+    invalidate_cache("config.json")
+    print(f"✅ Config saved to GitHub (+{added} / -{removed}).")
+    return added, removed
+
+def save_config(new_data, base=None, message="Update Tracker Config"):
+    """Pushes updated targets to config.json via API.
+
+    With `base` (the list new_data was edited from) only the difference is
+    committed, so concurrent edits by others are merged rather than overwritten.
+    Without it the file is replaced, still guarded by its blob SHA.
+    """
+    if base is None:
+        return update_config(add=new_data, reset=True, message=message)
+    before, after = TargetIndex(base), TargetIndex(new_data)
+    return update_config(add=[t for t in new_data if t not in before], remove=[t for t in base if t not in after],
+                         message=message)
+
+# --- PARTITIONED STORE ---
+# store/<table>/category=<c>/use_case=<u>/month=<YYYY-MM>/part-<append seq>-<day mask>-<uuid8>.parquet
+# The path is the index: the day mask (bit d-1 set for day d) lists the dates a
+# part holds, so filter values and slices are found without reading rows.
+# A month folder is compacted into one part once it collects STORE_COMPACT_PARTS
+# parts, or as soon as a later month is written, so the file count grows by
+# month rather than by day.
+# Rows carry their write order (ORDER_COLUMNS), so reads return them in the order
+# they were appended whatever folders they landed in.
+PARTITION_KEYS = ["category", "use_case", "month"]
+STORE_TABLES = ["history", "vectors", "rollups", "sources", "trends"]  # history plus the tables derived from it
+INDEX_COLUMNS = ["source", "date", "category", "use_case"]
+ORDER_COLUMNS = ["_append", "_row"]  # Append sequence, then position within that append
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}$")
+_last_append = 0
+_append_lock = threading.Lock()
+
+def _table_dir(table):
+    return os.path.join(STORE_DIR, table)
+
+def table_exists(table):
+    """True if the local store already has this table."""
+    return os.path.isdir(_table_dir(table))
+
+def _next_append():
+    """Nanosecond UTC clock, bumped so appends from this process never share or reverse a value."""
+    global _last_append
+    with _append_lock:
+        _last_append = max(time.time_ns(), _last_append + 1)
+        return _last_append
+
+def _month(date):
+    """'2026-03-14' -> '2026-03'; None for anything that is not an ISO date."""
+    return date[:7] if ISO_DATE.match(date) else None
+
+def _day_mask(dates):
+    mask = 0
+    for d in set(dates):
+        if ISO_DATE.match(d):
+            mask |= 1 << (int(d[8:10]) - 1)
+    return mask
+
+def _mask_dates(month, mask):
+    """Dates a part holds, from its folder's month and the day mask in its name."""
+    if not mask:
+        return [month]  # Rows without an ISO date keep their raw value as the folder name
+    return [f"{month}-{day + 1:02d}" for day in range(31) if mask >> day & 1]
+
+def _write_part(folder, df, seq):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"part-{seq:020d}-{_day_mask(df['date']):08x}-{uuid.uuid4().hex[:8]}.parquet")
+    tmp = f"{path}.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)  # Readers and compaction never see a half-written part
+    return path
+
+def _write_parts(table, df):
+    df = plain_columns(df)  # Parts store plain values, so old and new parts concatenate as one type
+    df["date"] = df["date"].astype(str)  # Same representation a CSV round-trip gives
+    seq = _next_append()
+    df["_append"] = seq
+    df["_row"] = range(len(df))
+    month = df["date"].map(lambda d: _month(d) or d).rename("month")
+    keys = [df[k] for k in PARTITION_KEYS if k in df.columns] + [month]
+    written = []
+    for values, part in df.groupby(keys, dropna=False, sort=True, observed=True):
+        folder = os.path.join(_table_dir(table), *(f"{k.name}={quote(str(v), safe='')}" for k, v in zip(keys, values)))
+        written.append(_write_part(folder, part, seq))
+    return written
+
+def compact_table(table, closed_before=None):
+    """Merges each month folder into one part once it holds STORE_COMPACT_PARTS parts, or any
+    number above one if its month is before `closed_before`. Returns the folders compacted."""
+    folders = {}
+    for f in glob.glob(os.path.join(_table_dir(table), "**", "*.parquet"), recursive=True):
+        folders.setdefault(os.path.dirname(f), []).append(f)
+    compacted = []
+    for folder, files in sorted(folders.items()):
+        month = unquote(os.path.basename(folder).partition("=")[2])
+        closed = closed_before is not None and _month(f"{month}-01") is not None and month < closed_before
+        if len(files) < 2 or (len(files) < STORE_COMPACT_PARTS and not closed):
+            continue
+        # Rows keep their own _append/_row, so the merged part reads back in the original order
+        _write_part(folder, _tables_to_frame(_read_parts(None, files), keep_order=True), _next_append())
+        for f in files:
+            os.remove(f)
+        compacted.append(folder)
+    return compacted
+
+def append_partitioned(table, df):
+    """Writes df as new Parquet files under store/<table>/category=…/use_case=…/month=…, then compacts.
+
+    Compaction replaces a month folder's parts with one part holding the same rows.
+    """
+    # Marker so an empty table still counts as created (git does not track empty folders)
+    os.makedirs(_table_dir(table), exist_ok=True)
+    open(os.path.join(_table_dir(table), ".keep"), "a").close()
+    if df is None or df.empty:
+        return []
+    written = _write_parts(table, df)
+    months = [m for m in (_month(str(d)) for d in df["date"].astype(str).unique()) if m]
+    compact_table(table, closed_before=max(months, default=None))
+    _CACHE.invalidate_prefix(table)
+    if table == "history":
+        invalidate_cache("history.csv")
+    return written
+
+def _concat_parts(frames):
+    frames = [f for f in frames if not f.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def _tables_to_frame(tables, keep_order=False):
+    """Concatenates part tables (columns missing from older parts become nulls) into one DataFrame, in write order."""
+    tables = [t for t in tables if t.num_rows]
+    if not tables:
+        return pd.DataFrame()
+    try:
+        table = pa.concat_tables(tables, promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # Parts disagree on a column's type (e.g. rank written as text by an old CSV row)
+        df = _concat_parts([t.to_pandas() for t in tables])
+        order = [c for c in ORDER_COLUMNS if c in df.columns]
+        df = df.sort_values(order, kind="stable") if order else df
+        return (df if keep_order else df.drop(columns=order)).reset_index(drop=True)
+    order = [c for c in ORDER_COLUMNS if c in table.column_names]
+    if order:
+        table = table.sort_by([(c, "ascending") for c in order])
+        table = table if keep_order else table.drop_columns(order)
+    return table.combine_chunks().to_pandas()
+
+def _table_reader(table):
+    """None for a local checkout of the table, else the GitHub reader (None too without a token)."""
+    return None if os.path.isdir(_table_dir(table)) else get_reader()
+
+def _list_parts(table, reader):
+    """[(source, path inside the table)]: local file paths, or blob SHAs from the recursive tree."""
+    if reader is None:
+        root = _table_dir(table)
+        files = glob.glob(os.path.join(root, "**", "*.parquet"), recursive=True)
+        return [(f, os.path.relpath(f, root).replace(os.sep, "/")) for f in files]
+    prefix = f"{STORE_DIR}/{table}/"
+    return [(e["sha"], e["path"][len(prefix):]) for e in reader.tree(recursive=True)
+            if e["type"] == "blob" and e["path"].startswith(prefix) and e["path"].endswith(".parquet")]
+
+def _read_part(reader, source, columns=None):
+    """One part file as an Arrow table; callers convert to pandas once, after concatenating."""
+    if reader is not None:
+        # Parquet needs a seekable buffer, so each blob is read once into bytes
+        source = BytesIO(reader.open_blob(source).read())
+    return pq.ParquetFile(source).read(columns=columns)
+
+def _read_parts(reader, sources, columns=None):
+    """Reads part files concurrently, returned in the order given (remote reads share the session pool)."""
+    if len(sources) < 2:
+        return [_read_part(reader, s, columns) for s in sources]
+    with ThreadPoolExecutor(max_workers=GITHUB_POOL_SIZE) as pool:
+        return list(pool.map(lambda s: _read_part(reader, s, columns), sources))
+
+def _build_index(table):
+    reader = _table_reader(table)
+    if reader is None and not table_exists(table):
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    # File names start with the append sequence, so sorting by name keeps append order
+    parts = sorted(_list_parts(table, reader), key=lambda p: os.path.basename(p[1]))
+    rows = []
+    for src, rel in parts:
+        *dirs, name = rel.split("/")
+        v = {k: unquote(val) for k, _, val in (seg.partition("=") for seg in dirs)}
+        mask = int(name.split("-")[2], 16)
+        rows.extend((src, date, v.get("category", ""), v.get("use_case", "")) for date in _mask_dates(v.get("month", ""), mask))
+    return pd.DataFrame(rows, columns=INDEX_COLUMNS)
+
+def partition_index(table):
+    """One row per (part file, date, category, use_case) of a store table (cached; treat as read-only).
+
+    Raises TruncatedTreeError when GitHub cannot list the whole store, rather than showing part of it.
+    """
+    def build():
+        try:
+            return _build_index(table)
+        except TruncatedTreeError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Store Index Error ({table}): {e}")
+            return pd.DataFrame(columns=INDEX_COLUMNS)
+    return _CACHE.get(f"{table}:index", lambda: _fingerprint(_table_dir(table)), build)
+
+def list_slices(table="history"):
+    """Distinct (category, use_case, date) values in first-seen order, without reading any rows."""
+    index = partition_index(table)
+    if index.empty and table == "history":
+        df = load_history()  # csv backend / not migrated yet
+        cols = ["category", "use_case", "date"]
+        if df.empty or not set(cols) <= set(df.columns):
+            return pd.DataFrame(columns=cols)
+        return df[cols].astype(str).drop_duplicates().reset_index(drop=True)
+    return index[["category", "use_case", "date"]].drop_duplicates().reset_index(drop=True)
+
+def load_slice(table, category=None, use_case=None, dates=None):
+    """Rows of one category / use case (optionally only some dates), reading only the parts that hold them.
+
+    Cached per slice; treat the frame as read-only.
+    """
+    dates = sorted(str(d) for d in dates) if dates is not None else None
+    key = f"{table}:slice:{category}:{use_case}:{dates}"
+    return _CACHE.get(key, lambda: _fingerprint(_table_dir(table)), lambda: _load_slice(table, category, use_case, dates))
+
+def _slice_mask(df, category, use_case, dates):
+    mask = pd.Series(True, index=df.index)
+    if category is not None:
+        mask &= df["category"].astype(str) == str(category)
+    if use_case is not None:
+        mask &= df["use_case"].astype(str) == str(use_case)
+    if dates is not None:
+        mask &= df["date"].astype(str).isin(dates)
+    return mask
+
+def _load_slice(table, category, use_case, dates):
+    index = partition_index(table)
+    if index.empty:
+        if table != "history":
+            return pd.DataFrame()
+        df = load_history()  # csv backend / not migrated yet
+        return df[_slice_mask(df, category, use_case, dates)].reset_index(drop=True) if not df.empty else df
+    hits = index[_slice_mask(index, category, use_case, dates)].drop_duplicates("source")
+    try:
+        tables = _read_parts(_table_reader(table), hits["source"].tolist())
+    except Exception as e:
+        print(f"⚠️ Store Load Error ({table}): {e}")
+        return pd.DataFrame()
+    if dates is not None:
+        # Parts span a month; keep only the requested days
+        wanted = pa.array(dates, pa.string())
+        tables = [t.filter(pc.is_in(t["date"].cast(pa.string()), value_set=wanted)) for t in tables]
+    return apply_schema(_tables_to_frame(tables), table)
+
+def load_partitioned(table):
+    """Loads every partition of a store table (cached; treat the frame as read-only)."""
+    return _CACHE.get(table, lambda: _fingerprint(_table_dir(table)), lambda: _load_partitioned(table))
+
+def _load_partitioned(table):
+    """Loads every partition of a store table (local checkout first, then GitHub API)."""
+    index = partition_index(table)
+    try:
+        df = _tables_to_frame(_read_parts(_table_reader(table), index["source"].drop_duplicates().tolist()))
+    except Exception as e:
+        print(f"⚠️ Store Load Error ({table}): {e}")
+        return pd.DataFrame()
+    return apply_schema(df, table)
+
+def load_vectors():
+    """Loads the normalized (run_id, brand, vector) table written at ingest."""
+    return load_partitioned("vectors")
+
+def load_rollups():
+    """Loads the per (category, use_case, date, brand) rollup table maintained by the audit job."""
+    return load_partitioned("rollups")
+
+def load_sources():
+    """Loads the per-source weighted attribution table (see attribution.py)."""
+    return load_partitioned("sources")
+
+def load_history():
+    """Loads history typed per schema.HISTORY_SCHEMA (cached; treat the frame as read-only)."""
+    return _CACHE.get("history.csv", lambda: _fingerprint(_table_dir("history"), "history.csv"), _load_history)
+
+def _load_history():
+    """Loads history from the partitioned store, falling back to history.csv (repo or local file)."""
+    # 0. Try Partitioned Store
+    if HISTORY_BACKEND == "parquet":
+        df = _load_partitioned("history")
+        if not df.empty:
+            return df
+
+    # 1. Try Local File
+    if os.path.exists("history.csv"):
+        try:
+            return apply_schema(pd.read_csv("history.csv"))
+        except:
+            pass
+
+    # 2. Try GitHub API (streams straight into the parser, even above the 1 MB contents limit)
+    try:
+        reader = get_reader()
+        if not reader: return pd.DataFrame()
+        
+        return apply_schema(pd.read_csv(reader.open_file("history.csv")))
+    except:
+        return pd.DataFrame()
+
+def save_history_csv(df):
+    """Saves history.csv locally (The Action's YAML handles the Push). Dates are written as YYYY-MM-DD."""
+    df = plain_columns(df)
+    if "date" in df.columns:
+        # Loaded rows carry datetime64, a run's rows datetime.date: one text form for both
+        df["date"] = pd.to_datetime(df["date"], errors="coerce", format="mixed").dt.strftime("%Y-%m-%d")
+    df.to_csv("history.csv", index=False)
+    invalidate_cache("history.csv")
+
+def append_history(new_df):
+    """Appends one run's rows. With the parquet backend only the new rows are written."""
+    if HISTORY_BACKEND != "parquet":
+        save_history_csv(pd.concat([load_history(), new_df], ignore_index=True))
+        return
+    if not os.path.isdir(_table_dir("history")):
+        _migrate_legacy_csv()
+    append_partitioned("history", new_df)
+
+def _migrate_legacy_csv():
+    """One-off: seeds the store from an existing history.csv so no rows are lost."""
+    try:
+        legacy = pd.read_csv("history.csv")
+    except Exception:
+        return
+    if not legacy.empty:
+        print(f"📦 Migrating {len(legacy)} rows from history.csv into {_table_dir('history')}/")
+        append_partitioned("history", legacy)
+
+def export_history_csv(path="history.csv"):
+    """Writes the full history as a single CSV (on demand; not part of the daily write path)."""
+    df = load_history()
+    df.to_csv(path, index=False)
+    return len(df)
+
+def clear_history():
+    """Deletes all stored history: history.csv and every store table, including those derived from history."""
+    for table in STORE_TABLES:
+        shutil.rmtree(_table_dir(table), ignore_errors=True)
+        _CACHE.invalidate_prefix(table)
+    save_history_csv(pd.DataFrame())
+    invalidate_cache()
@@ -0,0 +1,28 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Each test runs in an empty directory (config.json, store/, shards/ are relative) with a cold cache."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("AUDIT_TRACE_DIR", "")
+    storage.invalidate_cache()
+    yield tmp_path
+    storage.invalidate_cache()
+
+@pytest.fixture
+def use_github(monkeypatch):
+    """Call with a FakeGitHubServer to point storage's clients at it for the test."""
+    def connect(server):
+        monkeypatch.setattr(storage, "GITHUB_TOKEN", "test-token")
+        monkeypatch.setattr(storage, "REPO_NAME", server.repo_name)
+        monkeypatch.setattr(storage, "GITHUB_API_URL", server.url)
+        for client in ("_GITHUB", "_REPO", "_READER"):
+            monkeypatch.setattr(storage, client, None)
+        storage.invalidate_cache()
+    return connect
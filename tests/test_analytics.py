@@ -0,0 +1,44 @@
+import json
+import pandas as pd
+from analytics import VECTOR_COLUMNS, normalize_vectors
+
+def row(**blobs):
+    base = {"date": "2026-01-01", "run_id": "run-1", "category": "Shoes", "use_case": "Daily", "brand": "Nike"}
+    return {**base, **{k: v if isinstance(v, str) else json.dumps(v) for k, v in blobs.items()}}
+
+def test_vectors_match_across_blobs_ignoring_case():
+    df = pd.DataFrame([row(
+        vector_scores={"GRIP": 8, "comfort": 6},
+        vector_weights={"Grip": 60, "Comfort": 40},
+        vector_citations={"grip": "https://reddit.com/a", "Comfort": "https://rei.com/b"},
+        vector_details={"grip": {"kpi": "Wet traction", "type": "Hard", "source_logic": "Reviews"}},
+    )])
+    out = normalize_vectors(df).set_index("vector")
+    assert sorted(out.index) == ["Comfort", "Grip"]  # vector_weights spelling, one row per vector
+    assert out.loc["Grip", ["score", "weight"]].tolist() == [8, 60]
+    assert out.loc["Grip", "citation"] == "https://reddit.com/a"
+    assert out.loc["Grip", ["kpi", "vector_type", "source_logic"]].tolist() == ["Wet traction", "Hard", "Reviews"]
+    assert out.loc["Comfort", ["score", "weight"]].tolist() == [6, 40]
+    assert pd.isna(out.loc["Comfort", "kpi"])
+
+def test_empty_or_malformed_blobs_give_no_rows():
+    df = pd.DataFrame([
+        row(vector_scores="{}", vector_weights="", vector_citations="[1, 2]", vector_details="{broken"),
+        {"date": "2026-01-01", "brand": "Adidas"},
+    ])
+    out = normalize_vectors(df)
+    assert out.empty
+    assert list(out.columns) == VECTOR_COLUMNS
+
+def test_non_string_values_come_out_as_json_text():
+    df = pd.DataFrame([row(
+        vector_weights={"Grip": 100},
+        vector_citations={"Grip": ["https://a.com", "https://b.com"]},
+        vector_details={"Grip": {"kpi": {"metric": "traction"}, "type": ["Hard"], "source_logic": 3}},
+    )])
+    out = normalize_vectors(df).iloc[0]
+    assert json.loads(out["citation"]) == ["https://a.com", "https://b.com"]
+    assert json.loads(out["kpi"]) == {"metric": "traction"}
+    assert json.loads(out["vector_type"]) == ["Hard"]
+    assert out["source_logic"] == "3"
+    assert pd.isna(out["score"])
@@ -0,0 +1,34 @@
+from openai import AsyncOpenAI
+from audit_engine import run_targets_async
+from fakes import FakeOpenAIServer
+from tracing import run_tracer
+
+TARGETS = [{"brand": f"Brand {i}", "category": "Shoes", "use_case": "Daily"} for i in range(8)]
+
+def audit(server, **kwargs):
+    tracer = run_tracer("")
+    client = AsyncOpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+    rows = run_targets_async(TARGETS, client=client, concurrency=4, tracer=tracer, **kwargs)
+    return rows, [r for r in tracer.records if r["name"] == "llm.openai"]
+
+def test_rate_limited_calls_are_retried_and_traced():
+    with FakeOpenAIServer(fail_rate=0.25, fail_status=429, seed=1) as server:
+        rows, calls = audit(server, max_retries=10)
+    assert [r["brand"] for r in rows] == [t["brand"] for t in TARGETS]
+    assert server.failures > 0
+    assert server.calls == len(TARGETS) + server.failures
+    assert sum(c["retries"] for c in calls) == server.failures
+
+def test_client_errors_are_not_retried():
+    with FakeOpenAIServer(fail_rate=1.0, fail_status=400) as server:
+        rows, calls = audit(server, max_retries=10)
+    assert rows == []
+    assert server.calls == len(TARGETS)
+    assert all(c["status"] == "error" and c["retries"] == 0 for c in calls)
+
+def test_retries_stop_at_the_limit():
+    with FakeOpenAIServer(fail_rate=1.0, fail_status=503) as server:
+        rows, calls = audit(server, max_retries=1)
+    assert rows == []
+    assert server.calls == 2 * len(TARGETS)
+    assert all(c["retries"] == 1 for c in calls)
@@ -0,0 +1,103 @@
+import json
+import pandas as pd
+import pytest
+from attribution import domain_power, source_shares
+
+def legacy_power(weights_json, details_json):
+    """The section-6 loop the engine replaced, kept as the reference: {domain: (power, citations)}."""
+    scores, counts = {}, {}
+    weights, details = json.loads(weights_json), json.loads(details_json)
+    for vec, weight in weights.items():
+        if weight == 0:
+            continue
+        info = details.get(vec) or next((details[k] for k in details if k.lower() == vec.lower()), None)
+        if not info:
+            continue
+        sources = info.get("key_sources", [])
+        if sources and isinstance(sources[0], dict):
+            total = sum(i.get("score", 1) for i in sources) or 1
+            shares = [(i.get("domain", "Unknown"), i.get("score", 1) / total) for i in sources]
+        elif sources and isinstance(sources[0], str):
+            total = sum(1 / (i + 1) for i in range(len(sources)))
+            shares = [(s, (1 / (i + 1)) / total) for i, s in enumerate(sources)]
+        else:
+            continue
+        for domain, share in shares:
+            domain = domain.strip().lower()
+            scores[domain] = scores.get(domain, 0) + share * weight
+            counts[domain] = counts.get(domain, 0) + 1
+    return {d: (scores[d], counts[d]) for d in scores}
+
+def history(runs):
+    """History rows, one per (date, category, use_case, weights, details)."""
+    return pd.DataFrame([{"date": date, "category": cat, "use_case": case, "run_id": f"run-{date}",
+                          "vector_weights": json.dumps(weights), "vector_details": json.dumps(details)}
+                         for date, cat, case, weights, details in runs])
+
+def engine_power(df, by=()):
+    power = domain_power(source_shares(df), by=by)
+    keys = list(by) + ["Domain"]
+    return {tuple(r[k] for k in keys) if by else r["Domain"]: (r["Power Score"], r["Citations"])
+            for r in power.to_dict("records")}
+
+def assert_same(engine, legacy):
+    assert engine.keys() == legacy.keys()
+    for key, (power, citations) in legacy.items():
+        assert engine[key][0] == pytest.approx(power)
+        assert engine[key][1] == citations
+
+SCORED = {
+    "Grip": {"key_sources": [{"domain": "Reddit.com", "score": 3}, {"domain": "youtube.com", "score": 1}]},
+    "Comfort": {"key_sources": [{"domain": "reddit.com", "score": 2}, {"domain": " rei.com ", "score": 2},
+                                {"domain": "amazon.com"}]},
+}
+RANKED = {
+    "Grip": {"key_sources": ["reddit.com", "YouTube.com", "rei.com"]},
+    "Price": {"key_sources": ["amazon.com", "reddit.com"]},
+}
+
+@pytest.mark.parametrize("details", [SCORED, RANKED], ids=["scored", "ranked"])
+def test_matches_the_legacy_loop(details):
+    weights = {"Grip": 40, "Comfort": 35, "Price": 25}
+    df = history([("2026-01-01", "Shoes", "Daily", weights, details)])
+    assert_same(engine_power(df), legacy_power(json.dumps(weights), json.dumps(details)))
+
+def test_vector_lookup_ignores_case():
+    df = history([("2026-01-01", "Shoes", "Daily", {"grip": 50, "COMFORT": 50}, SCORED)])
+    assert set(source_shares(df)["vector"]) == {"grip", "COMFORT"}
+
+def test_zero_weight_vectors_are_skipped():
+    df = history([("2026-01-01", "Shoes", "Daily", {"Grip": 0, "Comfort": 100}, SCORED)])
+    shares = source_shares(df)
+    assert set(shares["vector"]) == {"Comfort"}
+    assert shares["share"].sum() == pytest.approx(1)
+
+def test_mixed_or_malformed_sources_are_skipped():
+    details = {
+        "Grip": {"key_sources": [{"domain": "reddit.com", "score": 1}, "youtube.com", 7, {"domain": "rei.com", "score": 3}]},
+        "Comfort": {"key_sources": "reddit.com"},
+        "Price": "not a dict",
+        "Style": {"key_sources": []},
+        "Weight": {},
+    }
+    weights = {v: 20 for v in details}
+    shares = source_shares(history([("2026-01-01", "Shoes", "Daily", weights, details)]))
+    assert shares[["vector", "domain"]].values.tolist() == [["Grip", "reddit.com"], ["Grip", "rei.com"]]
+    assert shares["share"].tolist() == pytest.approx([0.25, 0.75])
+
+def test_malformed_blobs_give_no_rows():
+    df = pd.DataFrame([{"date": "2026-01-01", "category": "Shoes", "use_case": "Daily", "run_id": "r",
+                        "vector_weights": "{not json", "vector_details": json.dumps(SCORED)}])
+    assert source_shares(df).empty
+
+def test_power_by_date_sums_every_slice_of_a_date():
+    weights = {"Grip": 40, "Comfort": 35, "Price": 25}
+    runs = [(date, cat, "Daily", weights, details)
+            for date in ("2026-01-01", "2026-01-02", "2026-01-03")
+            for cat, details in (("Shoes", SCORED), ("Trail", RANKED))]
+    expected = {}
+    for date, _, _, w, d in runs:
+        for domain, (power, citations) in legacy_power(json.dumps(w), json.dumps(d)).items():
+            p, c = expected.get((date, domain), (0, 0))
+            expected[(date, domain)] = (p + power, c + citations)
+    assert_same(engine_power(history(runs), by=["date"]), expected)
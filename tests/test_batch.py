@@ -0,0 +1,23 @@
+import json
+import os
+import daily_audit
+import storage
+from fakes import FakeOpenAIServer
+
+TARGETS = [{"brand": b, "category": "Shoes", "use_case": "Daily"} for b in ("Nike", "Adidas", "Hoka")]
+
+def run_batch_audit(server, monkeypatch, timeout):
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    monkeypatch.setattr(daily_audit, "OPENAI_KEY", "sk-test")
+    return daily_audit.run_audit(mode="batch", cache_dir="cache", trace_dir="", poll_interval=0, batch_timeout=timeout)
+
+def test_timed_out_batch_is_resumed_not_resubmitted(monkeypatch):
+    json.dump(TARGETS, open("config.json", "w"))
+    with FakeOpenAIServer(batch_polls=3) as server:
+        assert run_batch_audit(server, monkeypatch, timeout=0) is False  # Submit and exit
+        assert os.path.exists(os.path.join("cache", "batch", "state.json"))
+        assert storage.load_history().empty
+        run_batch_audit(server, monkeypatch, timeout=60)
+        assert len(server.batches) == 1
+    assert storage.load_history()["brand"].tolist() == [t["brand"] for t in TARGETS]
+    assert not os.path.exists(os.path.join("cache", "batch", "state.json"))
@@ -0,0 +1,51 @@
+import threading
+import time
+from storage import BlobCache
+
+def test_slow_load_does_not_block_other_keys():
+    cache = BlobCache(ttl=60)
+    started, release = threading.Event(), threading.Event()
+    def slow():
+        started.set()
+        release.wait(5)
+        return "slow"
+    worker = threading.Thread(target=cache.get, args=("a", lambda: 1, slow))
+    worker.start()
+    started.wait(5)
+    t0 = time.monotonic()
+    assert cache.get("b", lambda: 1, lambda: "fast") == "fast"
+    assert time.monotonic() - t0 < 1
+    release.set()
+    worker.join()
+    assert cache.get("a", lambda: 1, lambda: "reloaded") == "slow"
+
+def test_concurrent_readers_of_one_key_load_once():
+    cache = BlobCache(ttl=60)
+    loads = []
+    def loader():
+        loads.append(1)
+        time.sleep(0.05)
+        return "value"
+    threads = [threading.Thread(target=cache.get, args=("k", lambda: 1, loader)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(loads) == 1
+
+def test_least_recently_used_entries_are_evicted():
+    cache = BlobCache(ttl=60, max_entries=2)
+    cache.get("a", lambda: 1, lambda: "a")
+    cache.get("b", lambda: 1, lambda: "b")
+    cache.get("a", lambda: 1, lambda: "a2")  # Hit: "a" becomes the most recent
+    cache.get("c", lambda: 1, lambda: "c")
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.stats()["evictions"] == 1
+
+def test_load_overlapping_an_invalidation_is_not_kept():
+    cache = BlobCache(ttl=60)
+    def loader():
+        cache.invalidate("k")  # A writer lands while the old content is being parsed
+        return "stale"
+    assert cache.get("k", lambda: 1, loader) == "stale"
+    assert cache.get("k", lambda: 1, lambda: "fresh") == "fresh"
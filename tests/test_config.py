@@ -0,0 +1,32 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+import storage
+from fakes import FakeGitHubServer
+
+BASE = [{"brand": "Nike", "category": "Shoes", "use_case": "Daily"}]
+
+def remote_config(server):
+    return json.loads(server.files["config.json"])
+
+def test_concurrent_edits_are_merged_not_lost(use_github):
+    adds = [{"brand": f"Brand {i}", "category": "Shoes", "use_case": "Daily"} for i in range(6)]
+    with FakeGitHubServer({"config.json": json.dumps(BASE)}) as server:
+        use_github(server)
+        with ThreadPoolExecutor(max_workers=len(adds)) as pool:
+            results = list(pool.map(lambda t: storage.update_config(add=[t], message="test"), adds))
+        config = remote_config(server)
+    assert results == [(1, 0)] * len(adds)
+    assert config[0] == BASE[0]
+    assert sorted(t["brand"] for t in config[1:]) == sorted(t["brand"] for t in adds)
+    assert len(server.writes) == len(adds)
+    assert sum(method == "PUT" for method, _ in server.calls) > len(adds)  # Some writers hit a 409 and replayed
+
+def test_stale_base_merges_with_newer_commit(use_github):
+    theirs = {"brand": "Adidas", "category": "Shoes", "use_case": "Daily"}
+    mine = {"brand": "Hoka", "category": "Trail", "use_case": "Daily"}
+    with FakeGitHubServer({"config.json": json.dumps(BASE)}) as server:
+        use_github(server)
+        storage.update_config(add=[theirs])  # Someone else saves after this session loaded BASE
+        storage.save_config(BASE + [mine], base=BASE)
+        config = remote_config(server)
+    assert config == BASE + [theirs, mine]
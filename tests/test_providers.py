@@ -0,0 +1,46 @@
+import asyncio
+import json
+import daily_audit
+import storage
+from providers import HEDGE_MIN_SAMPLES, LatencyTracker, StubProvider, call_provider
+
+def warm_tracker(name, seconds=0.01):
+    tracker = LatencyTracker()
+    for _ in range(HEDGE_MIN_SAMPLES):
+        tracker.record(name, seconds)
+    return tracker
+
+def test_hedge_pays_into_rate_limiter():
+    latencies = iter([1.0, 0.0])  # The first call stalls, the backup answers at once
+    provider = StubProvider(latency=lambda: next(latencies))
+    acquired = []
+    async def acquire():
+        acquired.append(1)
+    _, _, hedged = asyncio.run(call_provider(provider, {}, warm_tracker("stub"), hedge=True, acquire=acquire))
+    assert hedged
+    assert provider.calls == 2
+    assert len(acquired) == 1
+
+def test_hedge_is_dropped_when_first_call_returns_while_waiting_for_budget():
+    provider = StubProvider(latency=0.1)
+    async def acquire():
+        await asyncio.sleep(0.3)  # Rate limit exhausted
+    _, _, hedged = asyncio.run(call_provider(provider, {}, warm_tracker("stub"), hedge=True, acquire=acquire))
+    assert not hedged
+    assert provider.calls == 1
+
+def test_audit_without_openai_needs_no_openai_key(monkeypatch):
+    with open("config.json", "w") as f:
+        json.dump([{"brand": "Nike", "category": "Shoes", "use_case": "Daily"}], f)
+    built = []
+    def build(names, openai_client=None):
+        built.append((names, openai_client))
+        return [StubProvider()]
+    def no_openai(**kwargs):
+        raise AssertionError("OpenAI client built for a run without OpenAI")
+    monkeypatch.setattr(daily_audit, "OPENAI_KEY", None)
+    monkeypatch.setattr(daily_audit, "AsyncOpenAI", no_openai)
+    monkeypatch.setattr(daily_audit, "build_providers", build)
+    daily_audit.run_audit(providers="gemini", use_cache=False, trace_dir="")
+    assert built == [("gemini", None)]
+    assert len(storage.load_history()) > 0
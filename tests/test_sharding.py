@@ -0,0 +1,65 @@
+import datetime
+import json
+import pytest
+import daily_audit
+import storage
+from audit_engine import build_row
+from fakes import FakeOpenAIServer
+from response_cache import Checkpoint, target_key
+from sharding import parse_shard, plan_shards, merge_shards
+
+TARGETS = [{"brand": b, "category": c, "use_case": "Daily"}
+           for b, c in [("Nike", "Shoes"), ("Adidas", "Shoes"), ("Hoka", "Trail"), ("Sony", "Audio"), ("Bose", "Audio")]]
+
+def run_shards(server, monkeypatch, count, shards=None, **kwargs):
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    monkeypatch.setattr(daily_audit, "OPENAI_KEY", "sk-test")
+    for i in shards or range(1, count + 1):
+        daily_audit.run_audit(mode="async", shard=(i, count), cache_dir="cache", trace_dir="", **kwargs)
+
+def test_parse_shard():
+    assert parse_shard("3/8") == (3, 8)
+    for bad in ("0/8", "9/8", "3", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(bad)
+
+def test_plan_is_deterministic_and_complete():
+    plan = plan_shards(TARGETS, 3)
+    assert plan == plan_shards(list(TARGETS), 3)
+    assert sorted(pos for entries in plan.values() for pos, _ in entries) == list(range(len(TARGETS)))
+
+def test_merge_restores_config_order(monkeypatch):
+    json.dump(TARGETS + [TARGETS[0]], open("config.json", "w"))
+    with FakeOpenAIServer() as server:
+        run_shards(server, monkeypatch, 3)
+    rows, paths = merge_shards()
+    assert len(paths) == 3
+    assert rows["brand"].tolist() == [t["brand"] for t in TARGETS]  # Duplicate target collapsed
+
+def test_merge_refuses_missing_shard(monkeypatch):
+    json.dump(TARGETS, open("config.json", "w"))
+    with FakeOpenAIServer() as server:
+        run_shards(server, monkeypatch, 3, shards=[1, 3])
+    with pytest.raises(ValueError, match=r"\[2\]"):
+        merge_shards()
+
+def test_resumed_shard_mixes_checkpointed_and_fresh_rows(monkeypatch):
+    json.dump(TARGETS, open("config.json", "w"))
+    # An earlier attempt finished the first target; its row comes back from JSON with a string date
+    checkpoint = Checkpoint("cache", run_key=f"{datetime.date.today().isoformat()}-shard-01-of-01")
+    checkpoint.record(target_key(TARGETS[0], "openai"), build_row(TARGETS[0], "{}", engine="openai"))
+    with FakeOpenAIServer() as server:
+        run_shards(server, monkeypatch, 1)
+        assert server.calls == len(TARGETS) - 1
+    rows, _ = merge_shards()
+    assert rows["brand"].tolist() == [t["brand"] for t in TARGETS]
+    assert rows["date"].nunique() == 1
+
+def test_saved_run_reads_back_in_config_order(monkeypatch):
+    json.dump(TARGETS, open("config.json", "w"))
+    with FakeOpenAIServer() as server:
+        run_shards(server, monkeypatch, 3)
+    assert daily_audit.merge_and_save(trace_dir="")
+    # Each target lands in its own category folder; the read must still follow the config
+    history = storage.load_history()
+    assert history.drop_duplicates("brand")["brand"].tolist() == [t["brand"] for t in TARGETS]
@@ -0,0 +1,97 @@
+import glob
+import json
+import os
+import shutil
+import pytest
+import bench
+import daily_audit
+import storage
+from fakes import FakeGitHubServer
+
+def daily_history(n_days):
+    """One category / use case, about 4 rows a day from 2026-01-01."""
+    return bench.synth_history(4 * n_days, n_brands=4, n_categories=1, n_use_cases=1, n_days=n_days)
+
+def append_daily(history):
+    for _, day in history.groupby("date", sort=True):
+        storage.append_partitioned("history", day)
+
+def month_parts(month):
+    return glob.glob(os.path.join(storage.STORE_DIR, "history", "*", "*", f"month={month}", "*.parquet"))
+
+def use_remote(use_github, server):
+    """Reads the store through `server` instead of the (removed) local checkout."""
+    shutil.rmtree(storage.STORE_DIR)
+    use_github(server)
+
+def store_files():
+    files = glob.glob(os.path.join(storage.STORE_DIR, "**", "*.parquet"), recursive=True)
+    return {f.replace(os.sep, "/"): open(f, "rb").read() for f in files}
+
+def test_clear_history_drops_derived_tables():
+    daily_audit.save_run(bench.synth_history(300, n_brands=20, n_categories=2, n_use_cases=2, n_days=5))
+    storage.clear_history()
+    fresh = bench.synth_history(10, n_brands=5, n_categories=1, n_use_cases=1, n_days=1, seed=1)
+    daily_audit.save_run(fresh)
+    assert len(storage.load_history()) == 10
+    assert storage.load_rollups()["mentions"].sum() == 10
+    assert storage.load_vectors()["run_id"].nunique() <= 10
+    assert storage.load_partitioned("trends")["mentions"].sum() == 10
+
+def test_daily_appends_compact_by_month():
+    history = daily_history(45)  # All of January, half of February
+    append_daily(history)
+    assert len(month_parts("2026-01")) == 1  # Closed once February was written
+    assert 1 < len(month_parts("2026-02")) < storage.STORE_COMPACT_PARTS
+    loaded = storage.load_history()
+    assert loaded["run_id"].astype(str).tolist() == history.sort_values("date", kind="stable")["run_id"].tolist()
+    assert storage.list_slices()["date"].tolist() == sorted(history["date"].unique())
+
+def test_load_slice_keeps_only_requested_dates():
+    history = daily_history(10)
+    append_daily(history)
+    cat, case = history["category"].iloc[0], history["use_case"].iloc[0]
+    rows = storage.load_slice("history", cat, case, dates=["2026-01-03", "2026-01-07"])
+    assert sorted(rows["date"].dt.strftime("%Y-%m-%d").unique()) == ["2026-01-03", "2026-01-07"]
+    assert len(rows) == history["date"].isin(["2026-01-03", "2026-01-07"]).sum()
+
+def test_remote_store_reads_like_local(use_github):
+    append_daily(daily_history(40))
+    local = storage.load_history()
+    with FakeGitHubServer(store_files()) as server:
+        use_remote(use_github, server)
+        assert storage.load_history()["run_id"].astype(str).tolist() == local["run_id"].astype(str).tolist()
+
+def test_truncated_tree_fails_loudly(use_github):
+    append_daily(daily_history(40))
+    with FakeGitHubServer(store_files(), tree_limit=3) as server:
+        use_remote(use_github, server)
+        with pytest.raises(storage.TruncatedTreeError):
+            storage.list_slices()
+
+def test_csv_backend_keeps_dates_across_appends(monkeypatch):
+    monkeypatch.setattr(storage, "HISTORY_BACKEND", "csv")
+    history = daily_history(10)
+    first, second = history.iloc[:20], history.iloc[20:]
+    daily_audit.save_run(first)
+    daily_audit.save_run(second)
+    storage.invalidate_cache()
+    loaded = storage.load_history()
+    assert len(loaded) == len(history)
+    assert loaded["date"].notna().all()
+    assert loaded["date"].dt.strftime("%Y-%m-%d").tolist() == history["date"].tolist()
+
+def test_large_files_stream_from_blobs(use_github):
+    history = daily_history(10)
+    targets = [{"brand": f"Brand {i}", "category": "Shoes", "use_case": "Daily"} for i in range(5)]
+    files = {"history.csv": history.to_csv(index=False), "config.json": json.dumps(targets)}
+    with FakeGitHubServer(files, inline_limit=64) as server:  # Both files are above the limit
+        use_github(server)
+        assert storage.load_history()["run_id"].astype(str).tolist() == history["run_id"].tolist()
+        assert storage.load_config() == targets
+        blob_reads = [route for _, route in server.calls if "/git/blobs/" in route]
+        assert len(blob_reads) == 2
+        reader = storage.get_reader()
+        storage.invalidate_cache()
+        assert storage.load_config() == targets
+        assert reader.not_modified > 0 and server.not_modified == reader.not_modified
@@ -0,0 +1,17 @@
+import daily_audit
+from openai import OpenAI
+from fakes import FakeOpenAIServer
+from tracing import run_tracer
+
+TARGETS = [{"brand": b, "category": "Shoes", "use_case": "Daily"} for b in ("Nike", "Adidas", "Hoka", "Asics")]
+
+def test_sync_retries_are_explicit_and_traced():
+    tracer = run_tracer("")
+    with FakeOpenAIServer(fail_rate=0.3, fail_status=429, seed=1) as server:
+        client = OpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+        rows = daily_audit.audit_targets_sync(client, TARGETS, tracer=tracer, max_retries=10)
+    assert len(rows) == len(TARGETS)
+    assert server.failures > 0
+    calls = [r for r in tracer.records if r["name"] == "llm.openai"]
+    assert sum(r["retries"] for r in calls) == server.failures
+    assert server.calls == len(TARGETS) + server.failures
@@ -0,0 +1,20 @@
+import os
+import time
+from tracing import Tracer, load_trace, prune_traces
+
+def test_load_trace_tail_keeps_the_latest_records(tmp_path):
+    tracer = Tracer(str(tmp_path / "app-2026-10-17.jsonl"))
+    for i in range(50):
+        tracer.record("render", 0.01, step=i)
+    records = load_trace(tracer.path, tail=5)
+    assert [r["step"] for r in records] == list(range(45, 50))
+    assert len(load_trace(tracer.path)) == 50
+
+def test_prune_traces_drops_only_old_files_of_the_prefix(tmp_path):
+    old = time.time() - 10 * 86400
+    for name in ("app-2026-10-01.jsonl", "app-2026-10-17.jsonl", "audit-20261001T080000Z.jsonl"):
+        (tmp_path / name).write_text("{}\n")
+    for name in ("app-2026-10-01.jsonl", "audit-20261001T080000Z.jsonl"):
+        os.utime(tmp_path / name, (old, old))
+    assert prune_traces(str(tmp_path), "app", keep_days=7) == 1
+    assert sorted(os.listdir(tmp_path)) == ["app-2026-10-17.jsonl", "audit-20261001T080000Z.jsonl"]
@@ -0,0 +1,134 @@
+"""Lightweight tracing: timed spans and per-call LLM metrics written as JSONL.
+
+Each record is one line, e.g.
+    {"run": "audit-20261017T080000Z", "name": "llm.openai", "start": 1792224000.1, "seconds": 1.42,
+     "status": "ok", "brand": "Nike", "retries": 1, "prompt_tokens": 12, "completion_tokens": 40}
+
+Span names are dotted ("save", "save.history", "render.3_scorecard"); summarize()
+reduces a trace to count / errors / p50 / p95 / total per name, plus retry and
+token totals where the records carry them.
+
+    python tracing.py traces/audit-20261017T080000Z.jsonl   # summary of an earlier run
+"""
+import collections
+import contextlib
+import datetime
+import glob
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+import pandas as pd
+
+TRACE_DIR = os.environ.get("AUDIT_TRACE_DIR", "traces")
+SUMMARY_COLUMNS = ["name", "count", "errors", "p50_ms", "p95_ms", "total_s"]
+SUM_FIELDS = ["retries", "prompt_tokens", "completion_tokens"]
+TRACE_KEEP_DAYS = int(os.environ.get("AUDIT_TRACE_KEEP_DAYS", "7"))
+
+class Tracer:
+    """Collects span records in memory and, when `path` is set, appends each one to a JSONL file."""
+
+    def __init__(self, path=None, run=None):
+        self.path = path
+        self.run = run or uuid.uuid4().hex[:8]
+        self.records = []
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, status="ok", start=None, **attrs):
+        """Adds one finished record (for timings measured by the caller, e.g. an LLM call)."""
+        entry = {"run": self.run, "name": name, "start": round(start or time.time() - seconds, 6),
+                 "seconds": round(seconds, 6), "status": status, **attrs}
+        with self.lock:
+            self.records.append(entry)
+            if self.path:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(entry, default=str) + "\n")
+        return entry
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        """Times the block. Yields `attrs` so the block can add fields (row counts, cache hits...)."""
+        start = time.time()
+        t0 = time.perf_counter()
+        status = "ok"
+        try:
+            yield attrs
+        except Exception as e:  # Not BaseException: Streamlit's rerun/stop signals are not failures
+            status = "error"
+            attrs.setdefault("error", repr(e))
+            raise
+        finally:
+            self.record(name, time.perf_counter() - t0, status, start, **attrs)
+
+    def summary(self):
+        return summarize(self.records)
+
+def span(tracer, name, **attrs):
+    """tracer.span(...) when tracing is on, otherwise a no-op context (still yields attrs)."""
+    return tracer.span(name, **attrs) if tracer else contextlib.nullcontext(attrs)
+
+def run_tracer(trace_dir=TRACE_DIR, prefix="audit"):
+    """A tracer writing to <trace_dir>/<prefix>-<UTC stamp>.jsonl (in memory only if trace_dir is falsy)."""
+    run = f"{prefix}-{datetime.datetime.now(datetime.timezone.utc):%Y%m%dT%H%M%SZ}"
+    return Tracer(os.path.join(trace_dir, f"{run}.jsonl") if trace_dir else None, run=run)
+
+def usage_fields(usage):
+    """Prompt/completion token counts from a usage dict (empty if the provider reported none)."""
+    if not usage:
+        return {}
+    return {k: usage.get(k) for k in ("prompt_tokens", "completion_tokens") if usage.get(k) is not None}
+
+def load_trace(path, tail=None):
+    """Records from a JSONL trace file (torn lines are skipped); only the last `tail` lines when set."""
+    records = []
+    with open(path) as f:
+        for line in (collections.deque(f, maxlen=tail) if tail else f):
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+def prune_traces(trace_dir, prefix, keep_days=TRACE_KEEP_DAYS):
+    """Deletes <trace_dir>/<prefix>-*.jsonl files last written more than `keep_days` ago. Returns how many."""
+    cutoff = time.time() - keep_days * 86400
+    removed = 0
+    for path in glob.glob(os.path.join(trace_dir, f"{prefix}-*.jsonl")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:  # Pruned by another process in between
+            continue
+    return removed
+
+def summarize(records):
+    """Per-name count, errors, p50/p95 latency (ms) and total seconds, slowest total first."""
+    df = pd.DataFrame(records)
+    if df.empty:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    g = df.groupby("name", sort=False)
+    out = pd.DataFrame({
+        "count": g.size(),
+        "errors": (df["status"] != "ok").groupby(df["name"], sort=False).sum(),
+        "p50_ms": g["seconds"].quantile(0.5) * 1000,
+        "p95_ms": g["seconds"].quantile(0.95) * 1000,
+        "total_s": g["seconds"].sum(),
+    })
+    for col in SUM_FIELDS:
+        if col in df.columns:
+            out[col] = pd.to_numeric(df[col], errors="coerce").groupby(df["name"], sort=False).sum(min_count=1)
+    out = out.reset_index().sort_values("total_s", ascending=False)
+    return out.round({"p50_ms": 1, "p95_ms": 1, "total_s": 3})
+
+def format_summary(summary):
+    """Markdown table for logs."""
+    return summary.fillna("").to_markdown(index=False) if not summary.empty else "(no spans recorded)"
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        print(f"⏱️ {path}")
+        print(format_summary(summarize(load_trace(path))))
@@ -0,0 +1,92 @@
+"""Rolling 7/30/90-day visibility, rank and distance per brand, maintained incrementally.
+
+The trends table holds one row per (category, use_case, brand, date) for every
+date a slice was audited and every brand active in it within the longest
+window. A row carries that day's totals plus the windowed metrics, so the
+dashboard reads a series as-is. A new run's windows are rolled from the day
+totals already stored for the last max(TREND_WINDOWS) days, never from the full
+history. Re-runs append rows again; readers keep the last one per key.
+"""
+import pandas as pd
+
+TREND_WINDOWS = (7, 30, 90)  # Days; a window ending on d covers (d - w, d]
+SLICE_KEYS = ["category", "use_case", "brand"]
+TREND_KEYS = ["category", "use_case", "brand", "date"]
+SUM_COLUMNS = ["mentions", "rank_sum", "rank_count", "distance_sum", "distance_count"]
+WINDOW_METRICS = ["mentions", "avg_rank", "avg_distance", "visibility"]
+TREND_COLUMNS = TREND_KEYS + ["type"] + SUM_COLUMNS + [f"{m}_{w}d" for w in TREND_WINDOWS for m in WINDOW_METRICS]
+
+def lookback_start(date):
+    """First date whose trend rows a run on `date` needs (inclusive)."""
+    return (pd.Timestamp(date) - pd.Timedelta(days=max(TREND_WINDOWS) - 1)).date().isoformat()
+
+def _as_keys(df):
+    """Copy with string keys, so frames from the store and from a run join cleanly."""
+    out = df.copy()
+    for col in TREND_KEYS:
+        out[col] = out[col].astype(str)
+    return out
+
+def latest_rows(trends):
+    """Last-written row per (category, use_case, brand, date)."""
+    if trends.empty:
+        trends = pd.DataFrame(columns=TREND_COLUMNS)
+    return _as_keys(trends).drop_duplicates(TREND_KEYS, keep="last").reset_index(drop=True)
+
+def build_trends(rollups, prior=None):
+    """Trend rows for the dates in `rollups`, continuing the series in `prior` trend rows.
+
+    `prior` only needs each slice's rows from lookback_start(first new date)
+    on, and must not hold dates after the first new one (rebuild the slice
+    from its full rollups in that case).
+    """
+    if rollups.empty:
+        return pd.DataFrame(columns=TREND_COLUMNS)
+    prior = latest_rows(prior if prior is not None else pd.DataFrame())
+    new = _as_keys(rollups)
+
+    # Day totals; a re-run of a stored date adds to it
+    days = pd.concat([prior[TREND_KEYS + ["type"] + SUM_COLUMNS], new[TREND_KEYS + ["type"] + SUM_COLUMNS]])
+    days[SUM_COLUMNS] = days[SUM_COLUMNS].astype(float)
+    days = days.groupby(TREND_KEYS, sort=False).agg(type=("type", "last"), **{c: (c, "sum") for c in SUM_COLUMNS}).reset_index()
+
+    # Output rows: every run date of a slice x every brand known to that slice (zero totals if absent)
+    run_dates = new[["category", "use_case", "date"]].drop_duplicates()
+    brands = days.drop_duplicates(SLICE_KEYS, keep="last")[SLICE_KEYS + ["type"]]
+    rows = run_dates.merge(brands, on=["category", "use_case"])
+    rows = rows.merge(days.drop(columns="type"), on=TREND_KEYS, how="left")
+    rows[SUM_COLUMNS] = rows[SUM_COLUMNS].fillna(0)
+    earlier = days.merge(run_dates, on=["category", "use_case", "date"], how="left", indicator=True)
+    earlier = earlier[earlier["_merge"] == "left_only"].drop(columns="_merge")
+
+    series = pd.concat([earlier.assign(_out=False), rows.assign(_out=True)], ignore_index=True)
+    series["_ts"] = pd.to_datetime(series["date"])
+    series = series.sort_values(SLICE_KEYS + ["_ts"], kind="stable").reset_index(drop=True)
+    # Running totals over the loaded days; a window is the difference across its start
+    cum = series.groupby(SLICE_KEYS, sort=False)[SUM_COLUMNS].cumsum()
+    points = pd.concat([series[SLICE_KEYS + ["_ts"]], cum], axis=1).sort_values("_ts", kind="stable")
+    out = series[series["_out"]].copy()
+    for w in TREND_WINDOWS:
+        starts = out[SLICE_KEYS + ["_ts"]].assign(_ts=out["_ts"] - pd.Timedelta(days=w), _row=out.index)
+        before = pd.merge_asof(starts.sort_values("_ts", kind="stable"), points, on="_ts", by=SLICE_KEYS)
+        before = before.set_index("_row").reindex(out.index)[SUM_COLUMNS].fillna(0)
+        sums = cum.loc[out.index] - before
+        avg_rank = sums["rank_sum"] / sums["rank_count"].where(sums["rank_count"] > 0)
+        out[f"mentions_{w}d"] = sums["mentions"]
+        out[f"avg_rank_{w}d"] = avg_rank
+        out[f"avg_distance_{w}d"] = sums["distance_sum"] / sums["distance_count"].where(sums["distance_count"] > 0)
+        out[f"visibility_{w}d"] = sums["mentions"] / avg_rank
+
+    # Brands with nothing inside the longest window drop out until they are mentioned again
+    out = out[out[f"mentions_{max(TREND_WINDOWS)}d"] > 0]
+    return out.sort_values(["date"] + SLICE_KEYS, kind="stable")[TREND_COLUMNS].reset_index(drop=True)
+
+def trend_series(trends, window=7):
+    """brand, type, date, Mentions, Avg_Rank, Avg_Distance, Visibility_Score for one rolling window."""
+    rows = latest_rows(trends)
+    out = pd.DataFrame({
+        "brand": rows["brand"], "type": rows["type"], "date": rows["date"],
+        "Mentions": rows[f"mentions_{window}d"], "Avg_Rank": rows[f"avg_rank_{window}d"],
+        "Avg_Distance": rows[f"avg_distance_{window}d"], "Visibility_Score": rows[f"visibility_{window}d"],
+    })
+    return out[out["Mentions"] > 0].sort_values(["date", "brand"]).reset_index(drop=True)